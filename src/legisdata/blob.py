@@ -0,0 +1,57 @@
+import base64
+import os
+import re
+import shutil
+from hashlib import sha256
+from pathlib import Path
+
+BLOB_PATH = Path(".") / "data" / "blob"
+BLOB_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+
+
+def blob_check(value: str) -> bool:
+    return BLOB_DIGEST.match(value) is not None
+
+
+def blob_copy(digest: str, source: Path, target: Path) -> None:
+    target_path = blob_get_path(digest, target)
+
+    if not target_path.exists():
+        os.makedirs(target_path.parent, exist_ok=True)
+        shutil.copyfile(
+            blob_get_path(digest, source), f"{target_path}.{os.getpid()}.tmp"
+        )
+        os.replace(f"{target_path}.{os.getpid()}.tmp", target_path)
+
+
+def blob_get_path(digest: str, root: Path = BLOB_PATH) -> Path:
+    return root / digest[:2] / digest
+
+
+def blob_put(data: bytes, root: Path = BLOB_PATH) -> str:
+    digest = sha256(data).hexdigest()
+    path = blob_get_path(digest, root)
+
+    # identical images (crests, letterheads) are only ever written once
+    if not path.exists():
+        os.makedirs(path.parent, exist_ok=True)
+
+        with open(f"{path}.{os.getpid()}.tmp", "wb") as blob_file:
+            blob_file.write(data)
+
+        os.replace(f"{path}.{os.getpid()}.tmp", path)
+
+    return digest
+
+
+def blob_read(digest: str, root: Path = BLOB_PATH) -> bytes:
+    with open(blob_get_path(digest, root), "rb") as blob_file:
+        return blob_file.read()
+
+
+def blob_reference(value: str | None, root: Path = BLOB_PATH) -> str | None:
+    # older extracts and parsed files carry the base64 payload itself
+    if value is None or blob_check(value):
+        return value
+
+    return blob_put(base64.b64decode(value), root)
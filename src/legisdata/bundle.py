@@ -0,0 +1,151 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, BinaryIO, Iterator, NamedTuple
+
+import typedload
+
+from legisdata.codec import codec_dump, codec_load
+
+BUNDLE_VERSION = 1
+BUNDLE_SUFFIX = ".ndjson"
+BUNDLE_AKN_SUFFIX = ".akn"
+BUNDLE_INDEX_SUFFIX = ".index.json"
+
+
+class BundleEntry(NamedTuple):
+    name: str
+    offset: int
+    length: int
+    akn_offset: int | None = None
+    akn_length: int | None = None
+
+
+class BundleIndex(NamedTuple):
+    version: int = BUNDLE_VERSION
+    entries: list[BundleEntry] = []
+
+
+def bundle_check(parse_path: Path) -> bool:
+    return bundle_get_path(parse_path, BUNDLE_INDEX_SUFFIX).exists()
+
+
+def bundle_get_path(parse_path: Path, suffix: str) -> Path:
+    # the bundle sits next to the parse directory it packs
+    return Path(f"{parse_path}{suffix}")
+
+
+def bundle_index_read(parse_path: Path) -> list[BundleEntry]:
+    with open(bundle_get_path(parse_path, BUNDLE_INDEX_SUFFIX)) as index_file:
+        index = typedload.load(json.load(index_file), BundleIndex)
+
+    if index.version != BUNDLE_VERSION:
+        raise ValueError(f"Unsupported bundle version {index.version}")
+
+    return index.entries
+
+
+def bundle_iter(parse_path: Path, type_: type) -> Iterator[tuple[str, Any, str | None]]:
+    with (
+        open(bundle_get_path(parse_path, BUNDLE_SUFFIX), "rb") as bundle_file,
+        open(bundle_get_path(parse_path, BUNDLE_AKN_SUFFIX), "rb") as akn_file,
+    ):
+        for entry in bundle_index_read(parse_path):
+            yield (entry.name, *bundle_read_entry(bundle_file, akn_file, entry, type_))
+
+
+def bundle_pack(parse_path: Path, type_: type) -> int:
+    entries = []
+
+    with (
+        open(f"{bundle_get_path(parse_path, BUNDLE_SUFFIX)}.tmp", "wb") as bundle_file,
+        open(f"{bundle_get_path(parse_path, BUNDLE_AKN_SUFFIX)}.tmp", "wb") as akn_file,
+    ):
+        for target in sorted(os.scandir(parse_path), key=lambda item: item.name):
+            if not (target.is_file() and target.name.endswith(".json")):
+                continue
+
+            with open(target) as parse_file:
+                value = codec_load(json.load(parse_file), type_)
+
+            # markup moves to the akn file, inline or referenced alike
+            akn = (
+                value.akn
+                if value.akn_file is None
+                else Path(parse_path, value.akn_file).read_text(encoding="utf-8")
+            )
+            akn_offset = akn_length = None
+            if akn is not None:
+                akn_offset = akn_file.tell()
+                akn_length = akn_file.write(akn.encode("utf-8"))
+
+            offset = bundle_file.tell()
+            length = bundle_file.write(
+                json.dumps(
+                    codec_dump(value._replace(akn=None, akn_file=None)),
+                    separators=(",", ":"),
+                ).encode("utf-8")
+            )
+            bundle_file.write(b"\n")
+
+            entries.append(
+                BundleEntry(
+                    name=target.name.removesuffix(".json"),
+                    offset=offset,
+                    length=length,
+                    akn_offset=akn_offset,
+                    akn_length=akn_length,
+                )
+            )
+
+    with open(
+        f"{bundle_get_path(parse_path, BUNDLE_INDEX_SUFFIX)}.tmp", "w"
+    ) as index_file:
+        json.dump(typedload.dump(BundleIndex(entries=entries)), index_file)
+
+    # the old index goes first and the new one last, a bundle without one is
+    # never read, so an interrupted pack never pairs an index with other data
+    if bundle_check(parse_path):
+        os.remove(bundle_get_path(parse_path, BUNDLE_INDEX_SUFFIX))
+
+    for suffix in (BUNDLE_SUFFIX, BUNDLE_AKN_SUFFIX, BUNDLE_INDEX_SUFFIX):
+        os.replace(
+            f"{bundle_get_path(parse_path, suffix)}.tmp",
+            bundle_get_path(parse_path, suffix),
+        )
+
+    return len(entries)
+
+
+def bundle_read(parse_path: Path, name: str, type_: type) -> tuple[Any, str | None]:
+    entry = next(
+        (entry for entry in bundle_index_read(parse_path) if entry.name == name), None
+    )
+    if entry is None:
+        raise KeyError(f"{name} is not in the bundle of {parse_path}")
+
+    with (
+        open(bundle_get_path(parse_path, BUNDLE_SUFFIX), "rb") as bundle_file,
+        open(bundle_get_path(parse_path, BUNDLE_AKN_SUFFIX), "rb") as akn_file,
+    ):
+        return bundle_read_entry(bundle_file, akn_file, entry, type_)
+
+
+def bundle_read_entry(
+    bundle_file: BinaryIO, akn_file: BinaryIO, entry: BundleEntry, type_: type
+) -> tuple[Any, str | None]:
+    bundle_file.seek(entry.offset)
+    value = codec_load(json.loads(bundle_file.read(entry.length)), type_)
+
+    if entry.akn_offset is None or entry.akn_length is None:
+        return value, None
+
+    akn_file.seek(entry.akn_offset)
+
+    return value, akn_file.read(entry.akn_length).decode("utf-8")
+
+
+def bundle_remove(parse_path: Path) -> None:
+    for suffix in (BUNDLE_INDEX_SUFFIX, BUNDLE_SUFFIX, BUNDLE_AKN_SUFFIX):
+        if bundle_get_path(parse_path, suffix).exists():
+            os.remove(bundle_get_path(parse_path, suffix))
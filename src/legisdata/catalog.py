@@ -0,0 +1,216 @@
+import json
+import os
+from concurrent.futures import Executor, Future
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple
+
+import structlog
+import typedload
+
+from legisdata.common import ListingSource, ListingType
+from legisdata.crawler import (
+    Fetcher,
+    ListingSession,
+    listing_get_index,
+    listing_get_session_files,
+)
+
+logger = structlog.get_logger()
+
+CATALOG_PATH = Path(".") / "data" / "catalog.json"
+CATALOG_VERSION = 1
+
+
+class CatalogSession(NamedTuple):
+    session: int
+    label: str
+    url: str
+    files: list[str] = []
+    fetch_time: str | None = None
+
+
+class CatalogYear(NamedTuple):
+    year: int
+    sessions: list[CatalogSession] = []
+
+
+class CatalogListing(NamedTuple):
+    listing_type: ListingType
+    index_url: str
+    years: list[CatalogYear] = []
+    fetch_time: str | None = None
+
+
+class Catalog(NamedTuple):
+    version: int = CATALOG_VERSION
+    listings: list[CatalogListing] = []
+
+
+def catalog_get(
+    fetcher: Fetcher,
+    executor: Executor,
+    sources: tuple[ListingSource, ...],
+    refresh: bool = False,
+    full: bool = False,
+    path: Path = CATALOG_PATH,
+    years: set[int] | None = None,
+    sessions: set[int] | None = None,
+) -> Catalog:
+    result = catalog_load(path)
+
+    if result is None or refresh or full or not catalog_check(result, years, sessions):
+        result = catalog_refresh(
+            fetcher, executor, sources, result, full, years, sessions
+        )
+        catalog_save(result, path)
+
+    return result
+
+
+def catalog_check(
+    catalog: Catalog, years: set[int] | None, sessions: set[int] | None
+) -> bool:
+    # sessions outside an earlier selection are listed without their files
+    return all(
+        session.fetch_time is not None
+        for listing in catalog.listings
+        for year in listing.years
+        if years is None or year.year in years
+        for session in year.sessions
+        if sessions is None or session.session in sessions
+    )
+
+
+def catalog_load(path: Path = CATALOG_PATH) -> Catalog | None:
+    if not path.exists():
+        return None
+
+    with open(path) as catalog_file:
+        return typedload.load(json.load(catalog_file), Catalog)
+
+
+def catalog_refresh(
+    fetcher: Fetcher,
+    executor: Executor,
+    sources: tuple[ListingSource, ...],
+    current: Catalog | None,
+    full: bool = False,
+    years: set[int] | None = None,
+    sessions: set[int] | None = None,
+) -> Catalog:
+    logger.info("Refreshing catalog", full=full, years=years, sessions=sessions)
+
+    known = {
+        (listing.listing_type, year.year, session.session): session
+        for listing in (current.listings if current else [])
+        for year in listing.years
+        for session in year.sessions
+    }
+    listing_indices = tuple(
+        executor.map(
+            lambda source: (source, listing_get_index(fetcher, source)), sources
+        )
+    )
+    fetch_time = str(datetime.now())
+
+    # only new sessions, moved sessions and the latest year (still growing) are
+    # fetched again, unless a full refresh is requested, and only within the
+    # selection, a single download never crawls the whole site
+    jobs: dict[tuple[ListingType, int, int], Future] = {}
+    kept: dict[tuple[ListingType, int, int], CatalogSession] = {}
+    for source, listing_index in listing_indices:
+        for year, links in listing_index.items():
+            for session, link in enumerate(links, 1):
+                key = (source.listing_type, year, session)
+
+                if (
+                    (years is None or year in years)
+                    and (sessions is None or session in sessions)
+                    and (
+                        full
+                        or year == max(listing_index)
+                        or key not in known
+                        or known[key].url != link.url
+                        or known[key].fetch_time is None
+                    )
+                ):
+                    jobs[key] = executor.submit(
+                        listing_get_session_files,
+                        fetcher,
+                        link.url,
+                        source.file_p_class,
+                    )
+
+                elif key in known and known[key].url == link.url:
+                    kept[key] = known[key]
+
+                else:
+                    # listed without its files until it is selected
+                    kept[key] = CatalogSession(
+                        session=session, label=link.label, url=link.url
+                    )
+
+    logger.info("Fetching session file lists", fetch=len(jobs), known=len(known))
+
+    return Catalog(
+        listings=[
+            CatalogListing(
+                listing_type=source.listing_type,
+                index_url=source.index_url,
+                years=[
+                    CatalogYear(
+                        year=year,
+                        sessions=[
+                            (
+                                CatalogSession(
+                                    session=session,
+                                    label=link.label,
+                                    url=link.url,
+                                    files=jobs[
+                                        (source.listing_type, year, session)
+                                    ].result(),
+                                    fetch_time=fetch_time,
+                                )
+                                if (source.listing_type, year, session) in jobs
+                                else kept[(source.listing_type, year, session)]
+                            )
+                            for session, link in enumerate(links, 1)
+                        ],
+                    )
+                    for year, links in listing_index.items()
+                ],
+                fetch_time=fetch_time,
+            )
+            for source, listing_index in listing_indices
+        ]
+    )
+
+
+def catalog_save(catalog: Catalog, path: Path = CATALOG_PATH) -> None:
+    os.makedirs(path.parent, exist_ok=True)
+
+    with open(f"{path}.tmp", "w") as catalog_file:
+        json.dump(typedload.dump(catalog), catalog_file, indent=2)
+
+    os.replace(f"{path}.tmp", path)
+
+
+def catalog_select(
+    catalog: Catalog,
+    sources: tuple[ListingSource, ...],
+    years: set[int] | None,
+    sessions: set[int] | None,
+) -> tuple[tuple[ListingSession, list[str]], ...]:
+    # a session without a fetch time has no file list yet, not an empty one
+    return tuple(
+        (ListingSession(source, year.year, session.session, session.url), session.files)
+        for listing in catalog.listings
+        for source in sources
+        if source.listing_type == listing.listing_type
+        for year in listing.years
+        if years is None or year.year in years
+        for session in year.sessions
+        if (sessions is None or session.session in sessions)
+        and session.fetch_time is not None
+    )
@@ -0,0 +1,36 @@
+import json
+import socket
+from pathlib import Path
+from typing import NamedTuple
+
+import typedload
+
+from legisdata.common import cache_get_path
+from legisdata.task import ExtractConfig, ExtractTask
+
+SERVER_SOCKET = cache_get_path("extract.sock")
+
+
+class ServerRequest(NamedTuple):
+    cwd: str
+    tasks: list[ExtractTask]
+    config: ExtractConfig
+    metrics_path: str
+    journal_path: str
+
+
+class ServerResponse(NamedTuple):
+    status: str
+    error: str | None = None
+    duration: float = 0.0
+
+
+def server_submit(
+    request: ServerRequest, socket_path: Path = SERVER_SOCKET
+) -> ServerResponse:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(str(socket_path))
+        client.sendall(f"{json.dumps(typedload.dump(request))}\n".encode("utf-8"))
+
+        with client.makefile("rb") as response_file:
+            return typedload.load(json.loads(response_file.readline()), ServerResponse)
@@ -0,0 +1,179 @@
+import json
+import time
+import types
+from hashlib import sha256
+from typing import IO, Any, Callable, Union, get_args, get_origin, get_type_hints
+
+import typedload
+
+CODEC_FORMAT = "legisdata-schema"
+# version 1 carried no schema fingerprint, so a stale file could not be told apart
+CODEC_VERSION = 2
+
+CodecDecoder = Callable[[Any], Any] | None
+
+codec_decoders: dict[Any, CodecDecoder] = {}
+codec_fingerprints: dict[type, str] = {}
+
+
+def codec_benchmark(items: list[tuple[Any, type]], repeat: int = 3) -> dict[str, float]:
+    result = {}
+
+    for name, dump, load in (
+        (
+            "typedload",
+            lambda value: json.dumps(typedload.dump(value), indent=2),
+            lambda data, type_: typedload.load(json.loads(data), type_),
+        ),
+        (
+            "codec",
+            lambda value: json.dumps(codec_dump(value), separators=(",", ":")),
+            lambda data, type_: codec_load(json.loads(data), type_),
+        ),
+    ):
+        encoded = [(dump(value), type_) for value, type_ in items]
+
+        # best of several runs, the first one also warms up the decoders
+        time_dump, time_load = [], []
+        for _ in range(repeat):
+            time_start = time.perf_counter()
+            for value, _ in items:
+                dump(value)
+            time_dump.append(time.perf_counter() - time_start)
+
+            time_start = time.perf_counter()
+            for data, type_ in encoded:
+                load(data, type_)
+            time_load.append(time.perf_counter() - time_start)
+
+        result[f"{name}_dump"] = min(time_dump)
+        result[f"{name}_load"] = min(time_load)
+        result[f"{name}_size"] = sum(len(data) for data, _ in encoded)
+
+    return result
+
+
+def codec_collect_fields(hint: Any, fields: dict[str, list[str]]) -> None:
+    if isinstance(hint, type) and issubclass(hint, tuple):
+        if hint.__name__ in fields:
+            return
+
+        fields[hint.__name__] = list(hint._fields)
+        for field_hint in get_type_hints(hint).values():
+            codec_collect_fields(field_hint, fields)
+
+    for arg in get_args(hint):
+        codec_collect_fields(arg, fields)
+
+
+def codec_dump(value: tuple) -> dict[str, Any]:
+    return {
+        "format": CODEC_FORMAT,
+        "version": CODEC_VERSION,
+        "schema": codec_fingerprint(type(value)),
+        "data": codec_encode(value),
+    }
+
+
+def codec_encode(value: Any) -> Any:
+    # records are tagged arrays, [name, *fields], in the order of the schema
+    if isinstance(value, tuple):
+        return [type(value).__name__, *map(codec_encode, value)]
+
+    if isinstance(value, list):
+        return list(map(codec_encode, value))
+
+    return value
+
+
+def codec_fingerprint(type_: type) -> str:
+    # fields are decoded by position, so their names and order are the identity
+    if type_ not in codec_fingerprints:
+        fields: dict[str, list[str]] = {}
+        codec_collect_fields(type_, fields)
+
+        codec_fingerprints[type_] = sha256(
+            json.dumps(fields, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+
+    return codec_fingerprints[type_]
+
+
+def codec_get_decoder(hint: Any) -> CodecDecoder:
+    if hint not in codec_decoders:
+        codec_decoders[hint] = codec_make_decoder(hint)
+
+    return codec_decoders[hint]
+
+
+def codec_load(data: Any, type_: type) -> Any:
+    # anything not written by codec_dump is an older typedload dump
+    if not (isinstance(data, dict) and data.get("format") == CODEC_FORMAT):
+        return typedload.load(data, type_)
+
+    if data.get("version") != CODEC_VERSION:
+        raise ValueError(f"Unsupported codec version {data.get('version')}")
+
+    if data.get("schema") != codec_fingerprint(type_):
+        raise ValueError(
+            f"Encoded with a different {type_.__name__} schema, parse it again"
+        )
+
+    decoder = codec_get_decoder(type_)
+
+    return data["data"] if decoder is None else decoder(data["data"])
+
+
+def codec_make_decoder(hint: Any) -> CodecDecoder:
+    """Build a decoder for a schema type, None where values pass through as-is."""
+    origin = get_origin(hint)
+
+    if isinstance(hint, type) and issubclass(hint, tuple):
+        hints = get_type_hints(hint)
+        fields = [codec_get_decoder(hints[field]) for field in hint._fields]
+
+        # plain fields are passed on as they are, after the type name tag
+        if not any(fields):
+            return lambda data: hint(*data[1 : len(fields) + 1])
+
+        return lambda data: hint(
+            *[
+                value if decoder is None else decoder(value)
+                for decoder, value in zip(fields, data[1:])
+            ]
+        )
+
+    if origin is list:
+        item = codec_get_decoder(get_args(hint)[0])
+
+        if item is None:
+            return None
+
+        return lambda data: [item(value) for value in data]
+
+    if origin in (Union, types.UnionType):
+        members = [arg for arg in get_args(hint) if arg is not type(None)]
+
+        if len(members) == 1:
+            member = codec_get_decoder(members[0])
+
+            if member is None:
+                return None
+
+            return lambda data: None if data is None else member(data)
+
+        if not all(isinstance(member, type) for member in members) or not all(
+            issubclass(member, tuple) for member in members
+        ):
+            return None
+
+        # the tag picks the member, instead of trying each one in turn
+        tags = {member.__name__: codec_get_decoder(member) for member in members}
+
+        return lambda data: None if data is None else tags[data[0]](data)
+
+    return None
+
+
+def codec_write(value: tuple, handle: IO[str]) -> None:
+    json.dump(codec_dump(value), handle, separators=(",", ":"))
@@ -1,5 +1,7 @@
+import os
 from enum import Enum
 from pathlib import Path
+from typing import NamedTuple
 
 
 class ListingType(Enum):
@@ -13,10 +15,40 @@ class ListingClass(Enum):
     PARSE = "parse"
 
 
+class ListingSource(NamedTuple):
+    listing_type: ListingType
+    css_class: str
+    index_url: str
+    file_p_class: str
+
+
+LISTING_SOURCES = (
+    ListingSource(
+        ListingType.Hansard,
+        "hansard",
+        "https://dewan.selangor.gov.my/penyata-rasmi/",
+        "mb-2",
+    ),
+    ListingSource(
+        ListingType.Inquiry,
+        "soalan",
+        "https://dewan.selangor.gov.my/arkib-soalan-mulut-dan-soalan-bertulis/",
+        "mb-1",
+    ),
+)
+
+
 def archive_exists(*archive_list: Path) -> bool:
     return all(archive_path.exists() for archive_path in archive_list)
 
 
+def cache_get_path(*parts: str) -> Path:
+    return Path(
+        os.environ.get("LEGISDATA_CACHE", Path.home() / ".cache" / "legisdata"),
+        *parts,
+    )
+
+
 def data_get_path(
     base_path: Path, listing_type: ListingType, listing_class: ListingClass
 ) -> Path:
@@ -24,4 +56,16 @@ def data_get_path(
 
 
 def path_generate(year: int, session: int) -> Path:
-    return Path(".") / "data" / str(year) / f"session-{session}"
\ No newline at end of file
+    return Path(".") / "data" / str(year) / f"session-{session}"
+
+
+def range_parse(value: str) -> set[int] | None:
+    if value.strip().lower() == "all":
+        return None
+
+    result = set()
+    for item in value.split(","):
+        start, _, end = item.strip().partition("-")
+        result.update(range(int(start), int(end or start) + 1))
+
+    return result
@@ -0,0 +1,392 @@
+import os
+import time
+from concurrent.futures import Executor, Future
+from hashlib import sha256
+from http import HTTPStatus
+from pathlib import Path
+from posixpath import basename
+from threading import Lock
+from typing import NamedTuple
+from urllib.parse import quote, urlparse
+
+import requests
+import structlog
+from parsel import Selector
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from legisdata.common import (
+    ListingClass,
+    ListingSource,
+    data_get_path,
+    path_generate,
+)
+from legisdata.manifest import Manifest, ManifestEntry, manifest_conditional_headers
+
+logger = structlog.get_logger()
+
+CHUNK_SIZE = 1 << 16
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class FetchConfig(NamedTuple):
+    workers: int = 4
+    rate: float = 1.0
+    retries: int = 5
+    backoff: float = 2.0
+    timeout: float = 60.0
+
+
+FETCH_DEFAULT = FetchConfig()
+
+
+class RateLimiter:
+    """Spaces out requests so each host sees at most `rate` requests per second."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self.lock = Lock()
+        self.schedule: dict[str, float] = {}
+
+    def wait(self, url: str) -> None:
+        host = urlparse(url).netloc
+
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.schedule.get(host, now))
+            self.schedule[host] = slot + self.interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Fetcher:
+    """A pooled HTTP session shared by every download thread."""
+
+    def __init__(self, config: FetchConfig) -> None:
+        self.config = config
+        self.limiter = RateLimiter(config.rate)
+        self.session = requests.Session()
+
+        adapter = HTTPAdapter(
+            pool_connections=config.workers,
+            pool_maxsize=config.workers,
+            max_retries=Retry(
+                total=config.retries,
+                backoff_factor=config.backoff,
+                status_forcelist=RETRY_STATUS,
+                allowed_methods=("GET", "HEAD"),
+                respect_retry_after_header=True,
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # saved pages stand in for the site for offline runs and benchmarks
+        self.fixtures = (
+            Path(os.environ["LEGISDATA_SITE_FIXTURES"])
+            if os.environ.get("LEGISDATA_SITE_FIXTURES")
+            else None
+        )
+        self.record = int(os.environ.get("LEGISDATA_SITE_RECORD", "0")) == 1
+
+    def __enter__(self) -> "Fetcher":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.session.close()
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        if self.fixtures and not self.record:
+            return fixture_response(self.fixtures, url)
+
+        self.limiter.wait(url)
+
+        response = self.session.get(url, timeout=self.config.timeout, **kwargs)
+        response.raise_for_status()
+
+        return response
+
+    def get_text(self, url: str) -> str:
+        if self.fixtures and not self.record:
+            return fixture_path(self.fixtures, url).read_text()
+
+        result = self.get(url).text
+
+        if self.fixtures:
+            os.makedirs(self.fixtures, exist_ok=True)
+            fixture_path(self.fixtures, url).write_text(result)
+
+        return result
+
+
+class IncompleteDownloadError(IOError):
+    pass
+
+
+class SessionLink(NamedTuple):
+    label: str
+    url: str
+
+
+ListingIndex = dict[int, list[SessionLink]]
+
+
+class ListingSession(NamedTuple):
+    source: ListingSource
+    year: int
+    session: int
+    url: str
+
+
+def archive_download(
+    fetcher: Fetcher,
+    executor: Executor,
+    listing_files: tuple[tuple[ListingSession, list[str]], ...],
+) -> None:
+    jobs: list[Future] = []
+    for listing, url_list in listing_files:
+        jobs.extend(archive_schedule(fetcher, executor, listing, url_list))
+
+    for job in jobs:
+        job.result()
+
+
+def archive_fetch_file(
+    fetcher: Fetcher,
+    manifest: Manifest,
+    listing: ListingSession,
+    url: str,
+    progress: str,
+) -> None:
+    listing_type = listing.source.listing_type
+    entry = manifest.get(url) or ManifestEntry(
+        url=url,
+        path=str(
+            data_get_path(
+                path_generate(listing.year, listing.session),
+                listing_type,
+                ListingClass.RAW,
+            )
+            / basename(url)
+        ),
+        year=listing.year,
+        session=listing.session,
+        dun="selangor",
+    )
+
+    logger.info(
+        f"Fetching {listing_type.value} document {progress}",
+        url=url,
+    )
+
+    for attempt in range(fetcher.config.retries + 1):
+        try:
+            if archive_stream(fetcher, manifest, manifest.get(url) or entry):
+                logger.info(
+                    f"Written {listing_type.value} to destination", file=entry.path
+                )
+
+            else:
+                logger.info(f"Skipping unchanged {listing_type.value}", file=entry.path)
+
+            break
+
+        except (
+            IncompleteDownloadError,
+            requests.ConnectionError,
+            requests.exceptions.ChunkedEncodingError,
+        ) as error:
+            if attempt == fetcher.config.retries:
+                raise
+
+            logger.warning(
+                f"Resuming interrupted {listing_type.value} download",
+                url=url,
+                attempt=attempt + 1,
+                error=str(error),
+            )
+
+
+def archive_schedule(
+    fetcher: Fetcher,
+    executor: Executor,
+    listing: ListingSession,
+    url_list: list[str],
+) -> list[Future]:
+    listing_type = listing.source.listing_type
+    raw_path = data_get_path(
+        path_generate(listing.year, listing.session), listing_type, ListingClass.RAW
+    )
+
+    logger.info(f"Creating directory to store {listing_type.value}")
+    os.makedirs(raw_path, exist_ok=True)
+
+    # superseded by the manifest
+    if (raw_path / "url_list.json").exists():
+        os.remove(raw_path / "url_list.json")
+
+    manifest = Manifest(raw_path / "manifest.json")
+
+    return [
+        executor.submit(
+            archive_fetch_file,
+            fetcher,
+            manifest,
+            listing,
+            listing_url,
+            f"{listing_idx + 1}/{len(url_list)}",
+        )
+        for listing_idx, listing_url in enumerate(url_list)
+    ]
+
+
+def archive_stream(fetcher: Fetcher, manifest: Manifest, entry: ManifestEntry) -> bool:
+    part_path = f"{entry.path}.part"
+    headers = manifest_conditional_headers(entry)
+
+    offset = os.path.getsize(part_path) if os.path.isfile(part_path) else 0
+    if offset and (entry.etag or entry.last_modified):
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = str(entry.etag or entry.last_modified)
+
+    try:
+        response = fetcher.get(entry.url, headers=headers, stream=True)
+
+    except requests.HTTPError as error:
+        if (
+            error.response is None
+            or error.response.status_code != HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+        ):
+            raise
+
+        # the partial file no longer lines up with the remote copy
+        os.remove(part_path)
+        return archive_stream(fetcher, manifest, entry)
+
+    with response:
+        if response.status_code == HTTPStatus.NOT_MODIFIED:
+            manifest.update(entry)
+            return False
+
+        is_partial = response.status_code == HTTPStatus.PARTIAL_CONTENT
+        if is_partial and not response.headers.get("Content-Range", "").startswith(
+            f"bytes {offset}-"
+        ):
+            os.remove(part_path)
+
+            raise IncompleteDownloadError("Server resumed from an unexpected offset")
+
+        size_expected = response_get_size(response, offset if is_partial else 0)
+        current = (
+            entry
+            if is_partial
+            else entry._replace(
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+        )
+
+        # record the validators first, so an interrupted download can be resumed
+        manifest.update(current._replace(size=None, sha256=None))
+
+        hasher = sha256()
+        if is_partial:
+            with open(part_path, "rb") as part_file:
+                for chunk in iter(lambda: part_file.read(CHUNK_SIZE), b""):
+                    hasher.update(chunk)
+
+        with open(part_path, "ab" if is_partial else "wb") as part_file:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                part_file.write(chunk)
+                hasher.update(chunk)
+
+            size = part_file.tell()
+
+    if size_expected is not None and size != size_expected:
+        if size > size_expected:
+            os.remove(part_path)
+
+        raise IncompleteDownloadError(
+            f"Expecting {size_expected} bytes, received {size} bytes"
+        )
+
+    if (
+        entry.sha256
+        and entry.etag
+        and entry.etag == current.etag
+        and entry.sha256 != hasher.hexdigest()
+    ):
+        os.remove(part_path)
+
+        raise IncompleteDownloadError("Checksum does not match the previous download")
+
+    os.replace(part_path, entry.path)
+    manifest.update(current._replace(size=size, sha256=hasher.hexdigest()))
+
+    return True
+
+
+def fixture_path(fixtures: Path, url: str) -> Path:
+    return fixtures / quote(url, safe="")
+
+
+def fixture_response(fixtures: Path, url: str) -> requests.Response:
+    path = fixture_path(fixtures, url)
+
+    response = requests.Response()
+    response.url = url
+    response.status_code = HTTPStatus.OK
+    response.headers["Content-Length"] = str(path.stat().st_size)
+    response.raw = open(path, "rb")
+
+    return response
+
+
+def listing_get_index(fetcher: Fetcher, source: ListingSource) -> ListingIndex:
+    logger.info(
+        f"Retrieving the index for {source.listing_type.value}", url=source.index_url
+    )
+
+    return listing_index_parse(
+        Selector(text=fetcher.get_text(source.index_url)), source.css_class
+    )
+
+
+def listing_get_session_files(
+    fetcher: Fetcher, listing_session_url: str, file_p_class: str
+) -> list[str]:
+    listing_session_html = Selector(text=fetcher.get_text(listing_session_url))
+
+    return listing_session_html.css(
+        f"div.entry-content p.{file_p_class} a::attr(href)"
+    ).getall()
+
+
+def listing_index_parse(listing_idx_html: Selector, listing_class: str) -> ListingIndex:
+    return {
+        int(str(listing_year.css("h4::text").get())): [
+            SessionLink(
+                label=str(link.css("::text").get()), url=str(link.attrib["href"])
+            )
+            for link in listing_year.css("ul.list-attachment li a")
+        ]
+        for listing_year in listing_idx_html.css(
+            f"div.{listing_class}-items div.{listing_class}-item"
+        )
+    }
+
+
+def response_get_size(response: requests.Response, offset: int) -> int | None:
+    result = None
+
+    if "Content-Range" in response.headers:
+        total = response.headers["Content-Range"].rpartition("/")[-1]
+        result = int(total) if total.isdigit() else None
+
+    elif "Content-Length" in response.headers and not response.headers.get(
+        "Content-Encoding"
+    ):
+        result = offset + int(response.headers["Content-Length"])
+
+    return result
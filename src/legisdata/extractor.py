@@ -0,0 +1,633 @@
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from hashlib import sha256
+from importlib.metadata import version
+from pathlib import Path
+from posixpath import basename
+from tempfile import TemporaryDirectory
+from typing import Iterator, NamedTuple
+
+import structlog
+from pypdf import PageObject, PdfReader, PdfWriter
+from unstructured.partition.common import get_last_modified_date
+from unstructured.partition.pdf import partition_pdf
+from unstructured_inference.models.base import get_model
+
+from legisdata.blob import BLOB_PATH, blob_copy
+from legisdata.common import cache_get_path
+from legisdata.journal import Journal, JournalEntry
+from legisdata.render import (
+    render_alias,
+    render_alias_remove,
+    render_cache_install,
+    render_cache_prune,
+)
+from legisdata.store import (
+    STORE_SUFFIX,
+    ExtractElement,
+    element_convert,
+    store_read,
+    store_remove_legacy,
+    store_write,
+)
+from legisdata.task import ExtractConfig, ExtractTask
+
+logger = structlog.get_logger()
+
+
+class ExtractError(RuntimeError):
+    pass
+
+
+class ExtractShard(NamedTuple):
+    task: ExtractTask
+    first_page: int | None = None
+    last_page: int | None = None
+    strategy: str | None = None
+
+
+class ExtractShardResult(NamedTuple):
+    shard: ExtractShard
+    elements: list[ExtractElement]
+    duration: float
+
+
+class ExtractMetric(NamedTuple):
+    pages: str
+    strategy: str
+    elements: int
+    duration: float
+
+
+class ExtractResult(NamedTuple):
+    task: ExtractTask
+    elements: int
+    duration: float
+    metrics: list[ExtractMetric] = []
+
+
+EXTRACT_CACHE_VERSION = 3
+
+# a page needs at least this much extractable text to skip the layout model
+ADAPTIVE_TEXT_MIN = 200
+
+# times a file is retried after its worker died before it is skipped
+EXTRACT_REQUEUE_MAX = 2
+EXTRACT_WATCH_INTERVAL = 1.0
+EXTRACT_TERMINATED = ".terminated"
+
+# start marker of the shard running in this pool worker
+extract_pool_marker: str | None = None
+
+
+def extract_cache_key(source: str, config: ExtractConfig) -> str:
+    hasher = sha256()
+    with open(source, "rb") as source_file:
+        for chunk in iter(lambda: source_file.read(1 << 20), b""):
+            hasher.update(chunk)
+
+    # anything that changes partition_pdf output belongs in the fingerprint
+    fingerprint = sha256(
+        json.dumps(
+            {
+                "cache": EXTRACT_CACHE_VERSION,
+                "languages": config.languages,
+                "strategy": config.strategy,
+                "image_block_types": config.image_block_types,
+                # sharding only happens with a worker pool
+                "pages_per_shard": (
+                    config.pages_per_shard if config.workers > 1 else 0
+                ),
+                "unstructured": version("unstructured"),
+                "unstructured_inference": version("unstructured_inference"),
+            },
+            sort_keys=True,
+        ).encode("utf-8")
+    ).hexdigest()
+
+    return f"{hasher.hexdigest()}-{fingerprint[:16]}"
+
+
+def extract_cache_restore(task: ExtractTask, cache_key: str) -> bool:
+    cache_path = cache_get_path("extract", f"{cache_key}{STORE_SUFFIX}")
+
+    if not cache_path.exists():
+        return False
+
+    logger.info(
+        f"Restoring cached extract {task.progress}",
+        source=basename(task.source),
+        target=task.target,
+    )
+    # blobs first, a published target never refers to a missing one
+    for element in store_read(cache_path):
+        if element.image:
+            blob_copy(element.image, cache_get_path("blob"), BLOB_PATH)
+
+    shutil.copyfile(cache_path, f"{task.target}.tmp")
+    os.replace(f"{task.target}.tmp", task.target)
+    store_remove_legacy(task.target)
+
+    return True
+
+
+def extract_cache_store(task: ExtractTask, cache_key: str) -> None:
+    cache_path = cache_get_path("extract", f"{cache_key}{STORE_SUFFIX}")
+    os.makedirs(cache_path.parent, exist_ok=True)
+
+    for element in store_read(task.target):
+        if element.image:
+            blob_copy(element.image, BLOB_PATH, cache_get_path("blob"))
+
+    shutil.copyfile(task.target, f"{cache_path}.tmp")
+    os.replace(f"{cache_path}.tmp", cache_path)
+
+
+def extract_log(result: ExtractResult) -> None:
+    logger.info(
+        f"Extracted file {result.task.progress}",
+        target=result.task.target,
+        elements=result.elements,
+        duration=round(result.duration, 2),
+    )
+
+
+def extract_merge(
+    shard_results: list[ExtractShardResult], cache_key: str | None
+) -> ExtractResult:
+    shard_results = sorted(
+        shard_results, key=lambda shard_result: shard_result.shard.first_page or 0
+    )
+    task = shard_results[0].shard.task
+    elements = [
+        element for shard_result in shard_results for element in shard_result.elements
+    ]
+
+    store_write(task.target, elements)
+    # the parser would otherwise read the stale pickle alongside the new store
+    store_remove_legacy(task.target)
+
+    if cache_key:
+        extract_cache_store(task, cache_key)
+
+    return ExtractResult(
+        task,
+        len(elements),
+        sum(shard_result.duration for shard_result in shard_results),
+        [
+            ExtractMetric(
+                pages=(
+                    f"{shard_result.shard.first_page}-{shard_result.shard.last_page}"
+                    if shard_result.shard.first_page
+                    else "all"
+                ),
+                strategy=shard_result.shard.strategy or "",
+                elements=len(shard_result.elements),
+                duration=round(shard_result.duration, 2),
+            )
+            for shard_result in shard_results
+        ],
+    )
+
+
+def extract_page_strategy(page: PageObject) -> str:
+    return (
+        "fast"
+        if len((page.extract_text() or "").strip()) >= ADAPTIVE_TEXT_MIN
+        and len(page.images) == 0
+        else "hi_res"
+    )
+
+
+def extract_partition(
+    source: str, config: ExtractConfig, strategy: str, **kwargs
+) -> list[ExtractElement]:
+    # images are moved to the blob store here, so only digests leave the worker
+    return [
+        element_convert(element)
+        for element in partition_pdf(
+            source,
+            languages=list(config.languages),
+            strategy=strategy,
+            extract_image_block_types=list(config.image_block_types),
+            extract_image_block_to_payload=True,
+            **kwargs,
+        )
+    ]
+
+
+def extract_checkpoint(
+    journal: Journal, metrics_path: Path, result: ExtractResult, key: str
+) -> None:
+    extract_log(result)
+    extract_metrics_write(metrics_path, [result])
+    journal.record(
+        JournalEntry(
+            source=result.task.source,
+            target=result.task.target,
+            key=key,
+            elements=result.elements,
+        )
+    )
+
+
+def extract_pool(
+    shards: tuple[ExtractShard, ...], config: ExtractConfig
+) -> Iterator[ExtractShardResult]:
+    attempts: Counter[ExtractShard] = Counter()
+    abandoned: set[ExtractTask] = set()
+    markers = {shard: str(idx) for idx, shard in enumerate(shards)}
+    queue = list(shards)
+
+    while queue:
+        with TemporaryDirectory() as marker_dir:
+            # spawn, so workers never inherit torch/OpenMP state from the parent
+            with ProcessPoolExecutor(
+                max(config.workers, 1),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=extract_pool_init,
+                initargs=(config,),
+                max_tasks_per_child=config.max_tasks_per_worker or None,
+            ) as executor:
+                jobs = {
+                    executor.submit(
+                        extract_pool_shard,
+                        shard,
+                        config,
+                        os.path.join(marker_dir, markers[shard]),
+                    ): shard
+                    for shard in queue
+                    if shard.task not in abandoned
+                }
+                queue = []
+
+                lost = []
+                for job in as_completed(jobs):
+                    shard = jobs[job]
+
+                    try:
+                        shard_result = job.result()
+
+                    except BrokenProcessPool:
+                        lost.append(shard)
+                        continue
+
+                    except Exception as error:
+                        # a corrupt PDF fails its own file, the pool carries on
+                        if shard.task not in abandoned:
+                            logger.error(
+                                f"Skipping file {shard.task.progress}",
+                                source=basename(shard.task.source),
+                                error=f"{type(error).__name__}: {error}",
+                            )
+                            abandoned.add(shard.task)
+
+                        continue
+
+                    if shard.task not in abandoned:
+                        yield shard_result
+
+            # a worker died (memory ceiling, OOM killer) and the pool terminated
+            # the others, which flag their shard on the way out (the executor has
+            # joined them by now), so only the shards started but not terminated
+            # were running in the dead one
+            started = [
+                shard
+                for shard in lost
+                if os.path.exists(os.path.join(marker_dir, markers[shard]))
+            ]
+            crashed = {
+                shard: Path(marker_dir, markers[shard]).read_text()
+                for shard in started
+                if not os.path.exists(
+                    os.path.join(marker_dir, markers[shard] + EXTRACT_TERMINATED)
+                )
+            }
+
+            for shard in lost:
+                if shard.task in abandoned:
+                    continue
+
+                # with no start marker at all the pool broke on its own (e.g. in
+                # extract_worker_init), charge everything so it cannot loop forever
+                if shard in crashed or not started:
+                    attempts[shard] += 1
+
+                    if attempts[shard] > EXTRACT_REQUEUE_MAX:
+                        logger.error(
+                            f"Skipping file {shard.task.progress}",
+                            source=basename(shard.task.source),
+                            attempts=attempts[shard],
+                        )
+                        abandoned.add(shard.task)
+
+                        continue
+
+                    logger.warning(
+                        f"Requeueing file {shard.task.progress}",
+                        source=basename(shard.task.source),
+                        attempt=attempts[shard],
+                        pid=crashed.get(shard),
+                    )
+
+                queue.append(shard)
+
+
+def extract_pool_init(config: ExtractConfig) -> None:
+    signal.signal(signal.SIGTERM, extract_pool_terminate)
+
+    extract_worker_init(config)
+
+
+def extract_pool_shard(
+    shard: ExtractShard, config: ExtractConfig, marker_path: str
+) -> ExtractShardResult:
+    global extract_pool_marker
+
+    # left behind if this worker dies, so the parent knows what it was running
+    with open(marker_path, "w") as marker_file:
+        marker_file.write(str(os.getpid()))
+
+    extract_pool_marker = marker_path
+    try:
+        return extract_shard(shard, config)
+
+    finally:
+        extract_pool_marker = None
+
+
+def extract_pool_terminate(signum: int, _frame) -> None:
+    # the pool terminates every worker once one has died, this one is not at fault
+    if extract_pool_marker is not None:
+        open(f"{extract_pool_marker}{EXTRACT_TERMINATED}", "w").close()
+
+    os._exit(128 + signum)
+
+
+def extract_run(
+    tasks: tuple[ExtractTask, ...],
+    config: ExtractConfig,
+    metrics_path: Path,
+    journal_path: Path,
+) -> None:
+    keys = {task: extract_cache_key(task.source, config) for task in tasks}
+
+    with Journal(journal_path, config.resume) as journal:
+        if config.resume:
+            logger.info(
+                "Resuming extraction",
+                completed=sum(
+                    1 for task in tasks if journal.completed(task.source, keys[task])
+                ),
+                total=len(tasks),
+            )
+            tasks = tuple(
+                task for task in tasks if not journal.completed(task.source, keys[task])
+            )
+
+        restored = set()
+        for task in tasks:
+            if config.cache and extract_cache_restore(task, keys[task]):
+                restored.add(task)
+                journal.record(
+                    JournalEntry(
+                        source=task.source,
+                        target=task.target,
+                        key=keys[task],
+                        elements=sum(1 for _ in store_read(task.target)),
+                    )
+                )
+
+        tasks = tuple(task for task in tasks if task not in restored)
+        cache_keys = {task: keys[task] if config.cache else None for task in tasks}
+
+        shards = tuple(
+            shard for task in tasks for shard in extract_shard_plan(task, config)
+        )
+        pending = Counter(shard.task for shard in shards)
+        completed: dict[ExtractTask, list[ExtractShardResult]] = {
+            task: [] for task in tasks
+        }
+
+        render_cache_install(config.render_cache > 0)
+
+        shard_results = (
+            extract_serial(shards, config)
+            if config.workers <= 1
+            and not (config.max_tasks_per_worker or config.max_memory)
+            else extract_pool(shards, config)
+        )
+
+        # every finished file is checkpointed, so a crash costs one document
+        for shard_result in shard_results:
+            task = shard_result.shard.task
+
+            completed[task].append(shard_result)
+            if len(completed[task]) == pending[task]:
+                extract_checkpoint(
+                    journal,
+                    metrics_path,
+                    extract_merge(completed.pop(task), cache_keys[task]),
+                    keys[task],
+                )
+
+        if config.render_cache > 0:
+            logger.info(
+                "Pruned render cache",
+                pages=render_cache_prune(config.render_cache),
+                max_size=config.render_cache,
+            )
+
+        # what is left failed, or was skipped after repeated worker crashes, and
+        # a partial session must not be uploaded as if it were complete
+        if completed:
+            raise ExtractError(
+                f"{len(completed)} file(s) could not be extracted: "
+                + ", ".join(sorted(basename(task.source) for task in completed))
+            )
+
+
+def extract_metrics_write(metrics_path: Path, results: list[ExtractResult]) -> None:
+    metrics = {}
+    if metrics_path.exists():
+        with open(metrics_path) as metrics_file:
+            metrics = json.load(metrics_file)
+
+    metrics.update(
+        {
+            result.task.source: [metric._asdict() for metric in result.metrics]
+            for result in results
+        }
+    )
+
+    with open(f"{metrics_path}.tmp", "w") as metrics_file:
+        json.dump(metrics, metrics_file, indent=2)
+
+    os.replace(f"{metrics_path}.tmp", metrics_path)
+
+
+def extract_serial(
+    shards: tuple[ExtractShard, ...], config: ExtractConfig
+) -> Iterator[ExtractShardResult]:
+    failed: set[ExtractTask] = set()
+
+    for shard in shards:
+        if shard.task in failed:
+            continue
+
+        try:
+            shard_result = extract_shard(shard, config)
+
+        except Exception as error:
+            logger.error(
+                f"Skipping file {shard.task.progress}",
+                source=basename(shard.task.source),
+                error=f"{type(error).__name__}: {error}",
+            )
+            failed.add(shard.task)
+            continue
+
+        yield shard_result
+
+
+def extract_shard(shard: ExtractShard, config: ExtractConfig) -> ExtractShardResult:
+    task = shard.task
+    strategy = shard.strategy or config.strategy
+    time_start = time.monotonic()
+
+    if shard.first_page is None or shard.last_page is None:
+        logger.info(
+            f"Extracting file {task.progress}",
+            source=basename(task.source),
+            target=task.target,
+            strategy=strategy,
+        )
+
+        return ExtractShardResult(
+            shard._replace(strategy=strategy),
+            extract_partition(task.source, config, strategy),
+            time.monotonic() - time_start,
+        )
+
+    logger.info(
+        f"Extracting file {task.progress}",
+        source=basename(task.source),
+        target=task.target,
+        pages=f"{shard.first_page}-{shard.last_page}",
+        strategy=strategy,
+    )
+
+    with TemporaryDirectory() as shard_dir:
+        shard_path = os.path.join(shard_dir, basename(task.source))
+
+        reader, writer = PdfReader(task.source), PdfWriter()
+        for page in reader.pages[shard.first_page - 1 : shard.last_page]:
+            writer.add_page(page)
+
+        with open(shard_path, "wb") as shard_file:
+            writer.write(shard_file)
+
+        # rendered pages are cached under the original PDF and page number
+        render_alias(shard_path, task.source, shard.first_page - 1)
+        try:
+            elements = extract_partition(
+                shard_path,
+                config,
+                strategy,
+                metadata_filename=task.source,
+                metadata_last_modified=get_last_modified_date(task.source),
+            )
+
+        finally:
+            render_alias_remove(shard_path)
+
+    # page numbers restart from 1 in every shard
+    return ExtractShardResult(
+        shard._replace(strategy=strategy),
+        [
+            (
+                element._replace(page_number=element.page_number + shard.first_page - 1)
+                if element.page_number is not None
+                else element
+            )
+            for element in elements
+        ],
+        time.monotonic() - time_start,
+    )
+
+
+def extract_shard_plan(
+    task: ExtractTask, config: ExtractConfig
+) -> tuple[ExtractShard, ...]:
+    is_adaptive = config.strategy == "adaptive"
+    shard_size = config.pages_per_shard if config.workers > 1 else 0
+
+    if not (is_adaptive or shard_size > 0):
+        return (ExtractShard(task),)
+
+    reader = PdfReader(task.source)
+    strategies = [
+        extract_page_strategy(page) if is_adaptive else config.strategy
+        for page in reader.pages
+    ]
+    shard_size = shard_size if shard_size > 0 else len(strategies)
+
+    # consecutive pages sharing a strategy, capped at shard_size pages
+    result: list[ExtractShard] = []
+    for page_number, strategy in enumerate(strategies, 1):
+        if (
+            result
+            and result[-1].strategy == strategy
+            and page_number - (result[-1].first_page or 0) < shard_size
+        ):
+            result[-1] = result[-1]._replace(last_page=page_number)
+
+        else:
+            result.append(ExtractShard(task, page_number, page_number, strategy))
+
+    if len(result) == 1:
+        return (ExtractShard(task, strategy=result[0].strategy),)
+
+    return tuple(result)
+
+
+def extract_worker_init(config: ExtractConfig) -> None:
+    if config.render_cache > 0:
+        render_cache_install()
+
+    if config.max_memory > 0:
+        threading.Thread(
+            target=extract_worker_watch, args=(config.max_memory,), daemon=True
+        ).start()
+
+    # load the layout model once per worker instead of on the first document
+    if config.strategy in ("hi_res", "adaptive"):
+        get_model()
+
+
+def extract_worker_rss() -> int:
+    with open("/proc/self/statm") as statm_file:
+        return int(statm_file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def extract_worker_watch(max_memory: int) -> None:
+    while True:
+        rss = extract_worker_rss()
+
+        if rss > max_memory << 20:
+            logger.error(
+                "Extraction worker exceeded its memory ceiling",
+                rss=rss >> 20,
+                ceiling=max_memory,
+            )
+            os._exit(1)
+
+        time.sleep(EXTRACT_WATCH_INTERVAL)
@@ -0,0 +1,64 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple
+
+import typedload
+from typedload.exceptions import TypedloadException
+
+
+class JournalEntry(NamedTuple):
+    source: str
+    target: str
+    key: str
+    elements: int
+    finish_time: str | None = None
+
+
+class Journal:
+    """Append-only record of the files finished by an extraction run."""
+
+    def __init__(self, path: Path, resume: bool = False) -> None:
+        self.path = path
+        self.entries: dict[str, JournalEntry] = {}
+
+        if resume and path.exists():
+            with open(path) as journal_file:
+                for line in journal_file:
+                    # the last line is cut short if the run was killed mid-write
+                    try:
+                        entry = typedload.load(json.loads(line), JournalEntry)
+                    except (ValueError, TypedloadException):
+                        continue
+
+                    self.entries[entry.source] = entry
+
+        # a fresh run starts a fresh journal, a resumed one keeps appending
+        self.journal_file = open(path, "a" if resume else "w")
+
+        if resume and path.stat().st_size > 0:
+            with open(path, "rb") as journal_file:
+                journal_file.seek(-1, os.SEEK_END)
+
+                if journal_file.read(1) != b"\n":
+                    self.journal_file.write("\n")
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.journal_file.close()
+
+    def completed(self, source: str, key: str) -> bool:
+        entry = self.entries.get(source)
+
+        return entry is not None and entry.key == key and os.path.isfile(entry.target)
+
+    def record(self, entry: JournalEntry) -> None:
+        entry = entry._replace(finish_time=str(datetime.now()))
+        self.entries[entry.source] = entry
+
+        self.journal_file.write(f"{json.dumps(typedload.dump(entry))}\n")
+        self.journal_file.flush()
+        os.fsync(self.journal_file.fileno())
@@ -1,55 +1,197 @@
 import json
 import mimetypes
 import os
-import pickle
-import time
+from concurrent.futures import ThreadPoolExecutor
 from itertools import chain
+from pathlib import Path
 from posixpath import basename
-from random import randrange
+from typing import Annotated
 
-import requests
 import structlog
 import typer
 from huggingface_hub import HfApi
-from parsel import Selector
-from unstructured.partition.pdf import partition_pdf
 
+from legisdata import schema
+from legisdata.bundle import (
+    BUNDLE_AKN_SUFFIX,
+    BUNDLE_INDEX_SUFFIX,
+    BUNDLE_SUFFIX,
+    bundle_pack,
+    bundle_remove,
+)
+from legisdata.catalog import catalog_get, catalog_load, catalog_select
+from legisdata.client import SERVER_SOCKET, ServerRequest, server_submit
+from legisdata.codec import codec_benchmark, codec_load
 from legisdata.common import (
+    LISTING_SOURCES,
     ListingClass,
     ListingType,
     archive_exists,
     data_get_path,
     path_generate,
+    range_parse,
 )
-from legisdata.parser.hansard import parse as hansard_parse
-from legisdata.parser.inquiry import parse as inquiry_parse
+from legisdata.crawler import FETCH_DEFAULT, FetchConfig, Fetcher, archive_download
+from legisdata.manifest import Manifest
+from legisdata.parser.runner import ParseTask, parse_run
+from legisdata.store import STORE_LEGACY_SUFFIX, STORE_SUFFIX, store_list
+from legisdata.task import EXTRACT_DEFAULT, ExtractTask
 
 app = typer.Typer()
 api = HfApi()
 logger = structlog.get_logger()
 
 
+WorkersOption = Annotated[int, typer.Option(help="Number of concurrent downloads")]
+RateOption = Annotated[
+    float, typer.Option(help="Maximum requests per second for each host")
+]
+RetriesOption = Annotated[
+    int, typer.Option(help="Retries for failed or throttled requests")
+]
+BackoffOption = Annotated[
+    float, typer.Option(help="Backoff factor (seconds) between retries")
+]
+RefreshOption = Annotated[
+    bool, typer.Option(help="Refresh the site catalog before downloading")
+]
+StrategyOption = Annotated[
+    str,
+    typer.Option(
+        help='partition_pdf strategy, or "adaptive" to only run hi_res on '
+        "pages without a usable text layer"
+    ),
+]
+SocketOption = Annotated[
+    Path, typer.Option(help="Unix socket of the extraction server")
+]
+
+
 @app.command()
-def download(year: int, session: int) -> None:
-    logger.info("Requesting download", year=year, session=session)
+def catalog(
+    full: Annotated[
+        bool, typer.Option(help="Re-fetch every session instead of only new ones")
+    ] = False,
+    workers: WorkersOption = FETCH_DEFAULT.workers,
+    rate: RateOption = FETCH_DEFAULT.rate,
+    retries: RetriesOption = FETCH_DEFAULT.retries,
+    backoff: BackoffOption = FETCH_DEFAULT.backoff,
+) -> None:
+    config = FetchConfig(workers=workers, rate=rate, retries=retries, backoff=backoff)
+    with Fetcher(config) as fetcher, ThreadPoolExecutor(config.workers) as executor:
+        result = catalog_get(
+            fetcher, executor, LISTING_SOURCES, refresh=True, full=full
+        )
 
-    archive_download(
-        year,
-        session,
-        ListingType.Hansard,
-        "hansard",
-        "https://dewan.selangor.gov.my/penyata-rasmi/",
-        "mb-2",
-    )
-    archive_download(
-        year,
-        session,
-        ListingType.Inquiry,
-        "soalan",
-        "https://dewan.selangor.gov.my/arkib-soalan-mulut-dan-soalan-bertulis/",
-        "mb-1",
+    for listing in result.listings:
+        logger.info(
+            f"Catalogued {listing.listing_type.value}",
+            years=[year.year for year in listing.years],
+            sessions=sum(len(year.sessions) for year in listing.years),
+            files=sum(
+                len(session.files)
+                for year in listing.years
+                for session in year.sessions
+            ),
+        )
+
+
+@app.command()
+def crawl(
+    years: Annotated[
+        str, typer.Argument(help='Years to fetch, e.g. "2019-2021,2023" or "all"')
+    ],
+    sessions: Annotated[
+        str, typer.Argument(help='Sessions to fetch, e.g. "1-3" or "all"')
+    ] = "all",
+    refresh: RefreshOption = False,
+    workers: WorkersOption = FETCH_DEFAULT.workers,
+    rate: RateOption = FETCH_DEFAULT.rate,
+    retries: RetriesOption = FETCH_DEFAULT.retries,
+    backoff: BackoffOption = FETCH_DEFAULT.backoff,
+) -> None:
+    logger.info("Requesting batch download", years=years, sessions=sessions)
+
+    config = FetchConfig(workers=workers, rate=rate, retries=retries, backoff=backoff)
+    with Fetcher(config) as fetcher, ThreadPoolExecutor(config.workers) as executor:
+        year_set, session_set = range_parse(years), range_parse(sessions)
+
+        archive_download(
+            fetcher,
+            executor,
+            catalog_select(
+                catalog_get(
+                    fetcher,
+                    executor,
+                    LISTING_SOURCES,
+                    refresh=refresh,
+                    years=year_set,
+                    sessions=session_set,
+                ),
+                LISTING_SOURCES,
+                year_set,
+                session_set,
+            ),
+        )
+
+    logger.info("Uploading downloaded archive to huggingface")
+    api.upload_folder(
+        folder_path="data",
+        repo_id=os.environ.get("LEGISDATA_HF_REPO", "sinarproject/legisdata"),
+        repo_type="dataset",
     )
 
+
+@app.command()
+def download(
+    year: int,
+    session: int,
+    refresh: RefreshOption = False,
+    workers: WorkersOption = FETCH_DEFAULT.workers,
+    rate: RateOption = FETCH_DEFAULT.rate,
+    retries: RetriesOption = FETCH_DEFAULT.retries,
+    backoff: BackoffOption = FETCH_DEFAULT.backoff,
+) -> None:
+    logger.info("Requesting download", year=year, session=session)
+
+    config = FetchConfig(workers=workers, rate=rate, retries=retries, backoff=backoff)
+    with Fetcher(config) as fetcher, ThreadPoolExecutor(config.workers) as executor:
+        # only the requested session is fetched, `legisdata catalog` crawls the rest
+        listing_files = catalog_select(
+            catalog_get(
+                fetcher,
+                executor,
+                LISTING_SOURCES,
+                refresh=refresh,
+                years={year},
+                sessions={session},
+            ),
+            LISTING_SOURCES,
+            {year},
+            {session},
+        )
+
+        # the session may be newer than the catalog
+        if len(listing_files) != len(LISTING_SOURCES) and not refresh:
+            listing_files = catalog_select(
+                catalog_get(
+                    fetcher,
+                    executor,
+                    LISTING_SOURCES,
+                    refresh=True,
+                    years={year},
+                    sessions={session},
+                ),
+                LISTING_SOURCES,
+                {year},
+                {session},
+            )
+
+        if len(listing_files) != len(LISTING_SOURCES):
+            raise ValueError("Invalid year or session is requested")
+
+        archive_download(fetcher, executor, listing_files)
+
     logger.info("Uploading downloaded archive to huggingface")
     api.upload_folder(
         folder_path="data",
@@ -59,7 +201,56 @@ def download(year: int, session: int) -> None:
 
 
 @app.command()
-def extract(year: int, session: int) -> None:
+def extract(
+    year: int,
+    session: int,
+    workers: Annotated[
+        int, typer.Option(help="Number of extraction processes")
+    ] = EXTRACT_DEFAULT.workers,
+    pages_per_shard: Annotated[
+        int,
+        typer.Option(
+            help="Split large PDFs into page ranges of this size (0 to disable)"
+        ),
+    ] = EXTRACT_DEFAULT.pages_per_shard,
+    cache: Annotated[
+        bool,
+        typer.Option(help="Reuse extracts of unchanged PDFs and settings"),
+    ] = EXTRACT_DEFAULT.cache,
+    strategy: StrategyOption = EXTRACT_DEFAULT.strategy,
+    resume: Annotated[
+        bool,
+        typer.Option(help="Skip files completed by an interrupted run of this session"),
+    ] = EXTRACT_DEFAULT.resume,
+    recycle_after: Annotated[
+        int,
+        typer.Option(
+            help="Replace each extraction process after this many files or page "
+            "ranges (0 to disable)"
+        ),
+    ] = EXTRACT_DEFAULT.max_tasks_per_worker,
+    max_memory: Annotated[
+        int,
+        typer.Option(
+            help="Kill and replace an extraction process once its resident memory "
+            "exceeds this many MiB, retrying its files (0 to disable)"
+        ),
+    ] = EXTRACT_DEFAULT.max_memory,
+    render_cache: Annotated[
+        int,
+        typer.Option(
+            help="Keep pages rendered for the layout model and OCR, up to this many "
+            "MiB, evicting the least recently used (0 to disable)"
+        ),
+    ] = EXTRACT_DEFAULT.render_cache,
+    server: Annotated[
+        bool,
+        typer.Option(
+            help="Submit the PDFs to a running `legisdata serve` with warm models"
+        ),
+    ] = False,
+    socket: SocketOption = SERVER_SOCKET,
+) -> None:
     logger.info("Extracting PDF", year=year, session=session)
 
     path_base = path_generate(year, session)
@@ -81,36 +272,89 @@ def extract(year: int, session: int) -> None:
         and mimetypes.guess_type(target.path)[0] == "application/pdf"
     )
 
-    for idx, target_file in enumerate(target_files):
-        with open(
-            target_file.path.replace("raw", "extract") + ".pickle", "wb"
-        ) as file_extract:
-            logger.info(
-                f"Extracting file {idx + 1}/{len(target_files)}",
-                source=target_file.name,
-                target=file_extract.name,
-            )
-            pickle.dump(
-                partition_pdf(
-                    target_file.path,
-                    languages=["msa", "eng"],
-                    strategy="hi_res",
-                    extract_image_block_types=["Image", "Table"],
-                    extract_image_block_to_payload=True,
-                ),
-                file_extract,
-            )
+    tasks = tuple(
+        ExtractTask(
+            source=target_file.path,
+            target=target_file.path.replace("raw", "extract") + STORE_SUFFIX,
+            progress=f"{idx + 1}/{len(target_files)}",
+        )
+        for idx, target_file in enumerate(target_files)
+    )
+    config = EXTRACT_DEFAULT._replace(
+        workers=workers,
+        pages_per_shard=pages_per_shard,
+        cache=cache,
+        strategy=strategy,
+        resume=resume,
+        max_tasks_per_worker=recycle_after,
+        max_memory=max_memory,
+        render_cache=render_cache,
+    )
+
+    if server:
+        response = server_submit(
+            ServerRequest(
+                cwd=os.getcwd(),
+                tasks=list(tasks),
+                config=config,
+                metrics_path=str(path_base / "extract-metrics.json"),
+                journal_path=str(path_base / "extract-journal.jsonl"),
+            ),
+            socket,
+        )
+        assert response.status == "done", response.error
+
+        logger.info("Extraction server finished", duration=round(response.duration, 2))
+
+    else:
+        # unstructured and the layout model are only loaded when extracting here
+        from legisdata.extractor import extract_run
+
+        extract_run(
+            tasks,
+            config,
+            path_base / "extract-metrics.json",
+            path_base / "extract-journal.jsonl",
+        )
 
     logger.info("Uploading extracted archive to huggingface")
     api.upload_folder(
         folder_path="data",
         repo_id=os.environ.get("LEGISDATA_HF_REPO", "sinarproject/legisdata"),
         repo_type="dataset",
+        # pickles replaced by a store are gone locally, those still here are kept
+        delete_patterns=[
+            f"{extract_path.relative_to('data')}/*{STORE_LEGACY_SUFFIX}"
+            for extract_path in (
+                data_get_path(path_base, ListingType.Hansard, ListingClass.EXTRACT),
+                data_get_path(path_base, ListingType.Inquiry, ListingClass.EXTRACT),
+            )
+        ],
     )
 
 
 @app.command()
-def parse(year: int, session: int) -> None:
+def parse(
+    year: int,
+    session: int,
+    workers: Annotated[
+        int, typer.Option(help="Number of files parsed in parallel")
+    ] = 1,
+    force: Annotated[
+        list[str],
+        typer.Option(
+            help="Parse files matching this name pattern (or hansard/inquiry) even "
+            "if they are unchanged, can be repeated"
+        ),
+    ] = [],
+    bundle: Annotated[
+        bool,
+        typer.Option(
+            help="Pack each listing into one NDJSON bundle with an offset index, "
+            "and upload the bundle instead of the individual files"
+        ),
+    ] = False,
+) -> None:
     logger.info("Parsing extracted PDFs", year=year, session=session)
 
     path_base = path_generate(year, session)
@@ -125,140 +369,153 @@ def parse(year: int, session: int) -> None:
             data_get_path(path_base, archive_type, ListingClass.PARSE), exist_ok=True
         )
 
-    hansard_parse(
-        year,
-        session,
-        tuple(target for target in os.scandir(hansard_path) if target.is_file()),
-        data_get_path(path_base, ListingType.Hansard, ListingClass.PARSE),
+    target_files = tuple(
+        (archive_type, target)
+        for archive_type, archive_path in (
+            (ListingType.Hansard, hansard_path),
+            (ListingType.Inquiry, inquiry_path),
+        )
+        for target in store_list(archive_path)
     )
-    inquiry_parse(
+
+    parse_run(
         year,
         session,
-        tuple(target for target in os.scandir(inquiry_path) if target.is_file()),
-        data_get_path(path_base, ListingType.Inquiry, ListingClass.PARSE),
+        tuple(
+            ParseTask(
+                listing_type=archive_type,
+                source=source,
+                target=data_get_path(path_base, archive_type, ListingClass.PARSE),
+                progress=f"{idx + 1}/{len(target_files)}",
+            )
+            for idx, (archive_type, source) in enumerate(target_files)
+        ),
+        path_base / "parse-manifest.json",
+        workers,
+        tuple(force),
     )
 
+    ignore_patterns, delete_patterns = [], []
+    for archive_type, schema_type in (
+        (ListingType.Hansard, schema.Hansard),
+        (ListingType.Inquiry, schema.Inquiry),
+    ):
+        parse_path = data_get_path(path_base, archive_type, ListingClass.PARSE)
+
+        if bundle:
+            logger.info(
+                f"Bundled {archive_type.value} files",
+                count=bundle_pack(parse_path, schema_type),
+            )
+
+            # the individual files stay local, for the parse manifest
+            ignore_patterns.append(f"{parse_path.relative_to('data')}/*")
+            delete_patterns.append(f"{parse_path.relative_to('data')}/*")
+
+        else:
+            # a bundle left from an earlier run would hide the new files
+            bundle_remove(parse_path)
+            delete_patterns.extend(
+                f"{parse_path.relative_to('data')}{suffix}"
+                for suffix in (BUNDLE_SUFFIX, BUNDLE_AKN_SUFFIX, BUNDLE_INDEX_SUFFIX)
+            )
+
     logger.info("Uploading parsed archive to huggingface")
     api.upload_folder(
         folder_path="data",
         repo_id=os.environ.get("LEGISDATA_HF_REPO", "sinarproject/legisdata"),
         repo_type="dataset",
+        ignore_patterns=ignore_patterns or None,
+        delete_patterns=delete_patterns,
     )
 
 
-def archive_download(
-    year: int,
-    session: int,
-    listing_type: ListingType,
-    listing_css_class: str,
-    listing_idx_url: str,
-    file_p_class: str,
+@app.command()
+def serve(
+    strategy: StrategyOption = EXTRACT_DEFAULT.strategy,
+    socket: SocketOption = SERVER_SOCKET,
 ) -> None:
-    logger.info(f"Retrieving the index for {listing_type.value}", url=listing_idx_url)
-    listing_idx_req = requests.get(listing_idx_url)
-    listing_idx_html = Selector(text=listing_idx_req.text)
-
-    listing_session_url = listing_get_session_url(
-        listing_idx_html,
-        listing_css_class,
-        listing_get_year_index(
-            listing_idx_html, listing_type.value, listing_css_class, year
-        ),
-        session,
-    )
+    from legisdata.server import server_run
 
-    logger.info(
-        f"Fetching {listing_type.value} list",
-        url=listing_session_url,
-    )
+    server_run(EXTRACT_DEFAULT._replace(strategy=strategy), socket)
 
-    logger.info(f"Creating directory to store {listing_type.value}")
-    os.makedirs(
-        data_get_path(path_generate(year, session), listing_type, ListingClass.RAW),
-        exist_ok=True,
-    )
 
-    listing_url_list = listing_get_session_files(listing_session_url, file_p_class)
-    with open(
-        data_get_path(path_generate(year, session), listing_type, ListingClass.RAW)
-        / "url_list.json",
-        "w",
-    ) as list_file:
-        for listing_idx, listing_url in enumerate(listing_url_list):
-            with open(
-                data_get_path(
-                    path_generate(year, session), listing_type, ListingClass.RAW
-                )
-                / basename(listing_url),
-                "wb",
-            ) as listing_file:
-                list_file.write(
-                    "{}\n".format(
-                        json.dumps(
-                            {
-                                "url": listing_url,
-                                "path": list_file.name,
-                                "year": year,
-                                "session": "session",
-                                "dun": "selangor",
-                            }
-                        )
+@app.command()
+def status(
+    years: Annotated[str, typer.Argument(help='Years to report, or "all"')] = "all",
+    sessions: Annotated[
+        str, typer.Argument(help='Sessions to report, or "all"')
+    ] = "all",
+) -> None:
+    current = catalog_load()
+    assert current, "Catalog is missing, run `legisdata catalog` first"
+
+    for listing, url_list in catalog_select(
+        current, LISTING_SOURCES, range_parse(years), range_parse(sessions)
+    ):
+        path_base = path_generate(listing.year, listing.session)
+        raw_path = data_get_path(
+            path_base, listing.source.listing_type, ListingClass.RAW
+        )
+        manifest = Manifest(raw_path / "manifest.json")
+
+        logger.info(
+            f"Status for {listing.source.listing_type.value}",
+            year=listing.year,
+            session=listing.session,
+            available=len(url_list),
+            downloaded=sum(
+                1
+                for url in url_list
+                if (entry := manifest.get(url))
+                and entry.sha256
+                and os.path.exists(entry.path)
+            ),
+            extracted=sum(
+                1
+                for url in url_list
+                if os.path.exists(
+                    data_get_path(
+                        path_base, listing.source.listing_type, ListingClass.EXTRACT
                     )
+                    / f"{basename(url)}{STORE_SUFFIX}"
                 )
+            ),
+        )
 
-                logger.info(
-                    f"Fetching {listing_type.value} document {listing_idx + 1}/{len(listing_url_list)}",
-                    url=listing_url,
-                )
-                listing_req = requests.get(listing_url)
-
-                logger.info(
-                    f"Writing {listing_type.value} to destination",
-                    file=listing_file.name,
-                )
-                listing_file.write(listing_req.content)
-
-            time.sleep(randrange(5, 10))
-
-
-def listing_get_session_files(listing_session_url: str, file_p_class: str) -> list[str]:
-    listing_session_req = requests.get(listing_session_url)
-    listing_session_html = Selector(text=listing_session_req.text)
-
-    return listing_session_html.css(
-        f"div.entry-content p.{file_p_class} a::attr(href)"
-    ).getall()
-
-
-def listing_get_session_url(
-    listing_idx_html: Selector, listing_class: str, year_idx: int, session: int
-) -> str:
-    listing_sessions = listing_idx_html.css(
-        f"div.{listing_class}-items div.{listing_class}-item ul.list-attachment"
-    )[year_idx].css("li")
-    logger.info("Sessions available", sessions=listing_sessions.css("a::text").getall())
-
-    if session > len(listing_sessions):
-        raise ValueError("Invalid session is requested")
-
-    return listing_sessions.css("a::attr(href)").getall()[session - 1]
 
+@app.command()
+def benchmark_codec(
+    year: int,
+    session: int,
+    repeat: Annotated[int, typer.Option(help="Runs to take the best time of")] = 3,
+) -> None:
+    path_base = path_generate(year, session)
 
-def listing_get_year_index(
-    listing_idx_html: Selector, listing_name: str, listing_class: str, year: int
-) -> int:
-    listing_years = [
-        int(year)
-        for year in listing_idx_html.css(
-            f"div.{listing_class}-items div.{listing_class}-item h4::text"
-        ).getall()
-    ]
+    items = []
+    for archive_type, schema_type in (
+        (ListingType.Hansard, schema.Hansard),
+        (ListingType.Inquiry, schema.Inquiry),
+    ):
+        parse_path = data_get_path(path_base, archive_type, ListingClass.PARSE)
+
+        for target in os.scandir(parse_path):
+            if target.is_file() and target.name.endswith(".json"):
+                with open(target) as parse_file:
+                    items.append(
+                        (codec_load(json.load(parse_file), schema_type), schema_type)
+                    )
 
-    logger.info(f"Years available for {listing_name}", years=listing_years)
-    if year not in listing_years:
-        raise ValueError("Invalid year is requested")
+    logger.info("Benchmarking parse output codecs", files=len(items), repeat=repeat)
 
-    return listing_years.index(year)
+    result = codec_benchmark(items, repeat)
+    for name in ("typedload", "codec"):
+        logger.info(
+            f"Benchmark for {name}",
+            dump=round(result[f"{name}_dump"], 3),
+            load=round(result[f"{name}_load"], 3),
+            size=result[f"{name}_size"],
+        )
 
 
 if __name__ == "__main__":
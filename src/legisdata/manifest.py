@@ -0,0 +1,82 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import NamedTuple
+
+import typedload
+
+MANIFEST_VERSION = 1
+
+
+class ManifestEntry(NamedTuple):
+    url: str
+    path: str
+    year: int
+    session: int
+    dun: str
+    etag: str | None = None
+    last_modified: str | None = None
+    size: int | None = None
+    sha256: str | None = None
+    fetch_time: str | None = None
+
+
+class ManifestData(NamedTuple):
+    version: int = MANIFEST_VERSION
+    entries: list[ManifestEntry] = []
+
+
+class Manifest:
+    """Thread-safe record of every downloaded file in a raw listing directory."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.lock = Lock()
+        self.entries: dict[str, ManifestEntry] = {}
+
+        if path.exists():
+            with open(path) as manifest_file:
+                self.entries = {
+                    entry.url: entry
+                    for entry in typedload.load(
+                        json.load(manifest_file), ManifestData
+                    ).entries
+                }
+
+    def get(self, url: str) -> ManifestEntry | None:
+        with self.lock:
+            return self.entries.get(url)
+
+    def update(self, entry: ManifestEntry) -> None:
+        with self.lock:
+            self.entries[entry.url] = entry._replace(fetch_time=str(datetime.now()))
+            self.save()
+
+    def save(self) -> None:
+        with open(f"{self.path}.tmp", "w") as manifest_file:
+            json.dump(
+                typedload.dump(ManifestData(entries=list(self.entries.values()))),
+                manifest_file,
+                indent=2,
+            )
+
+        os.replace(f"{self.path}.tmp", self.path)
+
+
+def manifest_conditional_headers(entry: ManifestEntry | None) -> dict[str, str]:
+    headers = {}
+
+    if entry and entry.size is not None and manifest_file_matches(entry):
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+    return headers
+
+
+def manifest_file_matches(entry: ManifestEntry) -> bool:
+    return os.path.isfile(entry.path) and os.path.getsize(entry.path) == entry.size
@@ -1,22 +1,21 @@
-import json
 import os
+import re
 from enum import Enum, auto
 from functools import reduce
 from itertools import chain
 from math import inf
 from pathlib import Path
+from posixpath import basename
+from typing import BinaryIO, Callable, Iterable, NamedTuple
 
 import structlog
-import typedload
 from lxml import builder, etree
-from unstructured.documents.elements import Element, Title
 
+from legisdata.codec import codec_write
 from legisdata.parser.common import (
     check_is_answer_to_inquiry,
     check_is_oral_inquiry_heading,
     check_is_written_inquiry_heading,
-    last_item_replace,
-    unpickler,
 )
 from legisdata.schema import (
     Answer,
@@ -29,6 +28,7 @@ from legisdata.schema import (
     Questions,
     Speech,
 )
+from legisdata.store import ExtractElement, store_get_name, store_read
 
 logger = structlog.get_logger()
 
@@ -52,6 +52,40 @@ HANSARD_SPEAKERS = (
 )
 
 
+class HansardBuilder:
+    """Mutable hansard, filled in place while parsing and frozen by `build`."""
+
+    __slots__ = ("meta", "present", "absent", "guest", "officer", "debate", "speakers")
+
+    def __init__(self, meta: Meta) -> None:
+        self.meta = meta
+        self.present: list[Person] = []
+        self.absent: list[Person] = []
+        self.guest: list[Person] = []
+        self.officer: list[Person] = []
+        self.debate: list[Speech | Questions] = []
+        self.speakers: tuple[tuple[int, int, int], re.Pattern] | None = None
+
+    def build(self) -> Hansard:
+        return Hansard(
+            meta=self.meta,
+            present=self.present,
+            absent=self.absent,
+            guest=self.guest,
+            officer=self.officer,
+            debate=self.debate,
+        )
+
+
+class HansardLine(NamedTuple):
+    """An element with its text normalized once for every check."""
+
+    element: ExtractElement
+    text: str
+    upper: str
+    lower: str
+
+
 class HansardSection(Enum):
     DOCUMENT_START = auto()
     PRESENT = auto()
@@ -64,6 +98,24 @@ class HansardSection(Enum):
     ANSWER = auto()
     END = auto()
 
+
+class HansardState:
+    """Where the parser is in a sitting, and the speech being collected."""
+
+    __slots__ = ("section", "cache", "hansard")
+
+    def __init__(self, hansard: HansardBuilder) -> None:
+        self.section = HansardSection.DOCUMENT_START
+        self.cache: HansardCache | None = None
+        self.hansard = hansard
+
+
+HansardTransition = tuple[
+    Callable[[HansardLine, HansardState], bool],
+    Callable[[HansardLine, HansardState], None],
+]
+
+
 def akn_get_container(E: builder.ElementMaker, component: Speech | Questions):
     return (
         E.speech(
@@ -80,9 +132,11 @@ def akn_get_container(E: builder.ElementMaker, component: Speech | Questions):
                     "question" if isinstance(item, Question) else "answer",
                     E(
                         "from",
-                        item.inquirer.name
-                        if isinstance(item, Question)
-                        else item.respondent.name,
+                        (
+                            item.inquirer.name
+                            if isinstance(item, Question)
+                            else item.respondent.name
+                        ),
                     ),
                     E.div(*[E.p(content.value) for content in item.content]),
                 )
@@ -92,34 +146,48 @@ def akn_get_container(E: builder.ElementMaker, component: Speech | Questions):
     )
 
 
-def akn_populate(hansard: Hansard) -> Hansard:
+def akn_write(hansard: Hansard, akn_file: BinaryIO) -> None:
     E = builder.ElementMaker()
 
-    return hansard._replace(
-        akn=etree.tostring(
-            E.akomaNtoso(
-                E.debate(
-                    E.debateBody(
-                        E.debateSection(
-                            *[
-                                akn_get_container(E, content)
-                                for content in hansard.debate
-                            ]
-                        ),
-                    ),
-                    name="hansard",
-                )
-            ),
-            pretty_print=True,  # type: ignore
-            xml_declaration=True,  # type: ignore
-            encoding="utf-8",  # type: ignore
-        ).decode("utf-8")
-    )
+    # only one debate component is built at a time, indented the same way
+    # etree.tostring(pretty_print=True) lays out the whole tree
+    with etree.xmlfile(akn_file, encoding="utf-8") as xml_file:
+        xml_file.write_declaration()
+
+        with xml_file.element("akomaNtoso"):
+            xml_file.write("\n  ")
+
+            with xml_file.element("debate", name="hansard"):
+                xml_file.write("\n    ")
+
+                with xml_file.element("debateBody"):
+                    xml_file.write("\n      ")
+
+                    if not hansard.debate:
+                        xml_file.write(E.debateSection())
+
+                    else:
+                        with xml_file.element("debateSection"):
+                            for component in hansard.debate:
+                                container = akn_get_container(E, component)
+                                etree.indent(container, space="  ", level=4)
+
+                                xml_file.write("\n        ", container)
+
+                            xml_file.write("\n      ")
+
+                    xml_file.write("\n    ")
+
+                xml_file.write("\n  ")
+
+            xml_file.write("\n")
+
+    akn_file.write(b"\n")
 
 
 def assembly_person_parse(
-    current: Hansard, element: Element, section: HansardSection
-) -> Hansard:
+    current: HansardBuilder, element: ExtractElement, section: HansardSection
+) -> None:
     area = element.text[element.text.find("(") : element.text.find(")") + 1]
     name = element.text.partition(area)[0].split(",")
     role = element.text.partition(area)[-1]
@@ -132,33 +200,21 @@ def assembly_person_parse(
         role=role.strip("()"),
     )
 
-    return current._replace(
-        **(
-            {"present": [*current.present, person]}
-            if section == HansardSection.PRESENT
-            else {"absent": [*current.absent, person]}
-        )
+    (current.present if section == HansardSection.PRESENT else current.absent).append(
+        person
     )
 
 
 def assembly_role_parse(
-    current: Hansard, element: Element, section: HansardSection
-) -> Hansard:
-    result = current
-
+    current: HansardBuilder, element: ExtractElement, section: HansardSection
+) -> None:
     role = element.text.strip("( )")
 
     if section == HansardSection.PRESENT and role:
-        result = current._replace(
-            present=last_item_replace(
-                current.present, lambda last: last._replace(role=role)
-            )
-        )
-
-    return result
+        current.present[-1] = current.present[-1]._replace(role=role)
 
 
-def check_is_answer(current: Hansard) -> bool:
+def check_is_answer(current: HansardBuilder) -> bool:
     return (
         len(current.debate) > 0
         and isinstance(current.debate[-1], Questions)
@@ -172,215 +228,127 @@ def check_is_answer(current: Hansard) -> bool:
     )
 
 
-def check_is_assembly_person(element: Element, section: HansardSection) -> bool:
-    text = element.text.upper().strip()
+def check_is_assembly_person(line: HansardLine) -> bool:
+    return line.upper.startswith("Y.B") or line.upper.startswith("Y.A.B")
 
-    return section in (HansardSection.PRESENT, HansardSection.ABSENT) and (
-        text.startswith("Y.B") or text.startswith("Y.A.B")
-    )
 
+def check_is_assembly_role(line: HansardLine) -> bool:
+    return line.text.startswith("(") and line.text.endswith(")")
 
-def check_is_assembly_role(element: Element, section: HansardSection) -> bool:
-    text = element.text.strip()
 
-    return (
-        section == HansardSection.PRESENT
-        and text.startswith("(")
-        and text.endswith(")")
-    )
+def check_is_event(line: HansardLine) -> bool:
+    # the first line after splitting at ")" can only start with "(" if the text does
+    return ")" in line.element.text and line.element.text.startswith("(")
 
 
-def check_is_event(element: Element, section: HansardSection) -> bool:
-    return (
-        section
-        in (
-            HansardSection.START,
-            HansardSection.SPEECH,
-            HansardSection.QUESTION,
-            HansardSection.ANSWER,
-        )
-        and ")" in element.text
-        and element.text.replace(")", ")\n").splitlines()[0].startswith("(")
-    )
+def check_is_guest(line: HansardLine) -> bool:
+    return line.upper.startswith("Y.B")
 
 
-def check_is_guest(element: Element, section: HansardSection) -> bool:
-    text = element.text.upper().strip()
+def check_is_header(line: HansardLine, header: ExtractElement) -> bool:
+    return line.upper == header.text.upper().strip()
 
-    return section == HansardSection.GUEST and (text.startswith("Y.B"))
 
+def check_is_officer(line: HansardLine) -> bool:
+    return line.lower.startswith("encik") or line.lower.startswith("puan")
 
-def check_is_header(element: Element, header: Element) -> bool:
-    return element.text.upper().strip() == header.text.upper().strip()
 
+def check_is_officer_outside(line: HansardLine) -> bool:
+    # outside of PEGAWAI BERTUGAS, only "Puan ..." lines were ever taken as officers
+    return line.lower.startswith("puan")
 
-def check_is_officer(element: Element, section: HansardSection) -> bool:
-    text = element.text.lower().strip()
 
-    return (
-        section == HansardSection.OFFICER
-        and text.startswith("encik")
-        or text.startswith("puan")
-    )
+def check_is_page_number(line: HansardLine) -> bool:
+    return line.text.isdigit()
 
 
-def check_is_page_number(element: Element) -> bool:
-    return element.text.strip().isdigit()
+def check_is_section_absent(line: HansardLine) -> bool:
+    return line.element.type == "Title" and line.upper.startswith("TIDAK HADIR")
 
 
-def check_is_section_absent(element: Element, section: HansardSection) -> bool:
-    return (
-        section == HansardSection.PRESENT
-        and isinstance(element, Title)
-        and element.text.upper().strip().startswith("TIDAK HADIR")
-    )
+def check_is_section_end(line: HansardLine) -> bool:
+    return line.element.type == "Title" and line.element.text.upper().strip(
+        "( )"
+    ).startswith("DEWAN DITANGGUHKAN")
 
 
-def check_is_section_end(element: Element, section: HansardSection) -> bool:
-    return (
-        section == HansardSection.START
-        and isinstance(element, Title)
-        and element.text.upper().strip("( )").startswith("DEWAN DITANGGUHKAN")
-    )
+def check_is_section_guest(line: HansardLine) -> bool:
+    return line.element.type == "Title" and line.upper == "TURUT HADIR"
 
 
-def check_is_section_guest(element: Element, section: HansardSection) -> bool:
-    return (
-        section == HansardSection.ABSENT
-        and isinstance(element, Title)
-        and element.text.upper().strip() == "TURUT HADIR"
-    )
+def check_is_section_officer(line: HansardLine) -> bool:
+    return line.element.type == "Title" and line.upper == "PEGAWAI BERTUGAS"
 
 
-def check_is_section_officer(element: Element, section: HansardSection) -> bool:
-    return (
-        section == HansardSection.GUEST
-        and isinstance(element, Title)
-        and element.text.upper().strip() == "PEGAWAI BERTUGAS"
-    )
+def check_is_section_present(line: HansardLine) -> bool:
+    return line.element.type == "Title" and line.upper == "YANG HADIR"
 
 
-def check_is_section_present(element: Element, section: HansardSection) -> bool:
-    return (
-        section == HansardSection.DOCUMENT_START
-        and isinstance(element, Title)
-        and element.text.upper().strip() == "YANG HADIR"
-    )
+def check_is_section_start(line: HansardLine) -> bool:
+    return line.element.type == "Title" and "mempengerusikan mesyuarat" in line.lower
+
+
+def check_is_speakline(line: HansardLine, hansard: HansardBuilder) -> bool:
+    return speaker_match(hansard, line) is not None
 
 
-def check_is_section_start(element: Element, section: HansardSection) -> bool:
+def check_is_speakline_alternative(line: HansardLine) -> bool:
+    items = line.element.text.split(" ")
     return (
-        section == HansardSection.OFFICER
-        and isinstance(element, Title)
-        and "mempengerusikan mesyuarat" in element.text.lower()
+        ":" in items
+        and items.index(":") < 10
+        and not line.upper.startswith("TAJUK")
+        and not line.upper.startswith("JAWAPAN")
     )
 
 
-def check_is_speakline(
-    element: Element, section: HansardSection, hansard: Hansard
-) -> bool:
-    text = element.text.strip().upper()
-
-    return section in (
-        HansardSection.START,
-        HansardSection.SPEECH,
-        HansardSection.QUESTION,
-        HansardSection.ANSWER,
-    ) and (
-        any(
-            text.startswith(person.raw.upper())
-            for person in chain(hansard.present, hansard.guest)
-            if person.raw
-        )
-        or any(text.startswith(role) for role in HANSARD_ROLES)
-        or any(
-            text.startswith(person.role.upper())
-            for person in hansard.officer
-            if person.role
+def cache_append_element(cache: HansardCache, element: ExtractElement) -> HansardCache:
+    # the content list is owned by the cache, so it grows in place
+    cache.content.append(
+        ContentElement(
+            type=element.type.lower(),
+            value=element.text_as_html or element.text,
+            image=element.image,
         )
     )
 
-
-def check_is_speakline_alternative(element: Element, section: HansardSection) -> bool:
-    items = element.text.split(" ")
     return (
-        section
-        in (
-            HansardSection.START,
-            HansardSection.SPEECH,
-            HansardSection.QUESTION,
-            HansardSection.ANSWER,
+        cache._replace(is_question=True)
+        if not cache.is_question
+        and (
+            check_is_oral_inquiry_heading(element)
+            or check_is_written_inquiry_heading(element)
         )
-        and ":" in items
-        and items.index(":") < 10
-        and not element.text.strip().upper().startswith("TAJUK")
-        and not element.text.strip().upper().startswith("JAWAPAN")
+        else cache
     )
 
 
-def cache_append_element(cache: HansardCache, element: Element) -> HansardCache:
-    return cache._replace(
-        is_question=cache.is_question
-        or check_is_oral_inquiry_heading(element)
-        or check_is_written_inquiry_heading(element),
-        content=[
-            *cache.content,
-            ContentElement(
-                type=type(element).__name__.lower(),
-                value=element.metadata.text_as_html or element.text,
-                image=element.metadata.image_base64,
-            ),
-        ],
-    )
-
-
-def cache_insert(cache: HansardCache, current: Hansard) -> Hansard:
-    if not cache:
-        return current
-
-    result = current
+def cache_insert(cache: HansardCache, current: HansardBuilder) -> None:
+    # an event inserts the cache without ending it, so later elements must not
+    # leak into what is inserted here
+    cache = cache._replace(content=list(cache.content))
 
     if cache.is_question:
-        result = current._replace(
-            debate=[
-                *current.debate,
-                Questions(
-                    content=[
-                        Question(
-                            inquirer=cache.speaker, role=None, content=cache.content
-                        )
-                    ]
-                ),
-            ]
+        current.debate.append(
+            Questions(
+                content=[
+                    Question(inquirer=cache.speaker, role=None, content=cache.content)
+                ]
+            )
         )
 
     elif check_is_answer(current):
-        result = current._replace(
-            debate=last_item_replace(
-                current.debate,
-                lambda questions: questions._replace(
-                    content=[
-                        *questions.content,
-                        Answer(
-                            respondent=cache.speaker, role=None, content=cache.content
-                        ),
-                    ]
-                ),
-            )
+        current.debate[-1].content.append(
+            Answer(respondent=cache.speaker, role=None, content=cache.content)
         )
 
     else:
-        result = current._replace(
-            debate=[
-                *current.debate,
-                Speech(by=cache.speaker, role=None, content=cache.content),
-            ]
+        current.debate.append(
+            Speech(by=cache.speaker, role=None, content=cache.content)
         )
 
-    return result
 
-
-def guest_parse(current: Hansard, element: Element) -> Hansard:
+def guest_parse(current: HansardBuilder, element: ExtractElement) -> None:
     role_idx = max(
         element.text.strip().find("Setiausaha"),
         element.text.strip().find("Penasihat"),
@@ -389,15 +357,12 @@ def guest_parse(current: Hansard, element: Element) -> Hansard:
     role = element.text.strip()[role_idx:]
     name = element.text.strip().removesuffix(role).split(",")
 
-    return current._replace(
-        guest=[
-            *current.guest,
-            Person(name=name[0], raw=name[0], title=name[1:], area=None, role=role),
-        ]
+    current.guest.append(
+        Person(name=name[0], raw=name[0], title=name[1:], area=None, role=role)
     )
 
 
-def officer_parse(current: Hansard, element: Element) -> Hansard:
+def officer_parse(current: HansardBuilder, element: ExtractElement) -> None:
     role_idx = reduce(
         lambda current, incoming: incoming if (0 < incoming < current) else current,
         [
@@ -419,168 +384,281 @@ def officer_parse(current: Hansard, element: Element) -> Hansard:
         .split("|")
     ]
 
-    return current._replace(
-        officer=current.officer
-        + [Person(name=name, raw=name, role=role) for name in names]
-    )
+    current.officer.extend(Person(name=name, raw=name, role=role) for name in names)
 
 
-def speaker_parse(current: Hansard, element: Element) -> str:
-    text = element.text.strip().upper()
+def speaker_get_matcher(current: HansardBuilder) -> re.Pattern:
+    # officers can still be added mid-debate, so the roster size is the cache key
+    key = (len(current.present), len(current.guest), len(current.officer))
 
-    for person in chain(current.present, current.guest):
-        if person.raw and text.startswith(person.raw.upper()):
-            return person.raw.upper()
+    if current.speakers is None or current.speakers[0] != key:
+        candidates = chain(
+            (person.raw.upper() for person in chain(current.present, current.guest)),
+            HANSARD_ROLES,
+            (person.role.upper() for person in current.officer if person.role),
+        )
 
-    for role in HANSARD_ROLES:
-        if text.startswith(role):
-            return role
+        # alternatives are tried in order, so the roster order still decides
+        # between speakers sharing a prefix
+        current.speakers = (
+            key,
+            re.compile(
+                "|".join(
+                    re.escape(candidate)
+                    for candidate in dict.fromkeys(candidates)
+                    if candidate
+                )
+            ),
+        )
+
+    return current.speakers[1]
+
+
+def speaker_match(current: HansardBuilder, line: HansardLine) -> str | None:
+    match = speaker_get_matcher(current).match(line.upper)
+
+    return match.group(0) if match else None
 
-    for person in current.officer:
-        if person.role and text.startswith(person.role.upper()):
-            return person.role.upper()
 
-    return "_UNKNOWN"
+def speaker_parse(current: HansardBuilder, line: HansardLine) -> str:
+    return speaker_match(current, line) or "_UNKNOWN"
 
 
 def speakline_alternative_parse(
-    cache: HansardCache | None, current: Hansard, element: Element
-) -> tuple[HansardCache, Hansard]:
+    cache: HansardCache | None, current: HansardBuilder, element: ExtractElement
+) -> HansardCache:
     speaker = element.text.partition(":")[0].strip()
     # name = speaker[speaker.find("(") : speaker.find(")") + 1] or speaker
     # role = speaker.partition(name)[0].strip() or None
 
-    return (
-        HansardCache(
-            # person=Person(name=name.strip("( )"), role=role),
-            speaker=Person(name=speaker, raw=speaker),
-            content=[
-                ContentElement(
-                    type=type(element).__name__.lower(),
-                    value="".join(element.text.partition(":")[2:]).strip(),
-                    image=element.metadata.image_base64,
-                )
-            ],
-        ),
-        cache_insert(cache, current) if cache else current,
+    if cache:
+        cache_insert(cache, current)
+
+    return HansardCache(
+        # person=Person(name=name.strip("( )"), role=role),
+        speaker=Person(name=speaker, raw=speaker),
+        content=[
+            ContentElement(
+                type=element.type.lower(),
+                value="".join(element.text.partition(":")[2:]).strip(),
+                image=element.image,
+            )
+        ],
     )
 
 
 def speakline_parse(
-    cache: HansardCache | None, current: Hansard, element: Element
-) -> tuple[HansardCache, Hansard]:
-    speaker = speaker_parse(current, element)
+    cache: HansardCache | None, current: HansardBuilder, line: HansardLine
+) -> HansardCache:
+    element = line.element
+    speaker = speaker_parse(current, line)
 
-    return (
-        HansardCache(
-            speaker=Person(name=speaker, raw=speaker),
-            content=[
-                ContentElement(
-                    type=type(element).__name__.lower(),
-                    value=element.text[len(speaker) :].strip(": "),
-                    image=element.metadata.image_base64,
-                )
-            ],
-        ),
-        cache_insert(cache, current) if cache else current,
+    if cache:
+        cache_insert(cache, current)
+
+    return HansardCache(
+        speaker=Person(name=speaker, raw=speaker),
+        content=[
+            ContentElement(
+                type=element.type.lower(),
+                value=element.text[len(speaker) :].strip(": "),
+                image=element.image,
+            )
+        ],
     )
 
 
-def parse(
-    year: int,
-    session: int,
-    hansard_files: tuple[os.DirEntry[str], ...],
-    parse_path: Path,
-) -> None:
-    for file_idx, (file_entry, elements) in enumerate(map(unpickler, hansard_files)):
-        logger.info(
-            f"Parsing file {file_idx + 1}/{len(hansard_files)}", path=file_entry.path
-        )
+def cache_append_handle(line: HansardLine, state: HansardState) -> None:
+    assert state.cache
+    state.cache = cache_append_element(state.cache, line.element)
 
-        elements_stripped = [
-            element
-            for element in elements
-            if not check_is_header(element, elements[0])
-            and not check_is_page_number(element)
-        ]
-
-        section = HansardSection.DOCUMENT_START
-        parsed = Hansard(
-            meta=Meta(
-                source=file_entry.path, year=year, session=session, dun="selangor"
-            )
-        )
-        cache = None
 
-        for idx, element in enumerate(elements_stripped):
-            if check_is_section_present(element, section):
-                section = HansardSection.PRESENT
+def event_handle(_: HansardLine, state: HansardState) -> None:
+    if state.cache:
+        cache_insert(state.cache, state.hansard)
 
-            elif check_is_section_absent(element, section):
-                section = HansardSection.ABSENT
 
-            elif check_is_section_guest(element, section):
-                section = HansardSection.GUEST
+def line_normalize(element: ExtractElement) -> HansardLine:
+    text = element.text.strip()
 
-            elif check_is_section_officer(element, section):
-                section = HansardSection.OFFICER
+    return HansardLine(
+        element=element, text=text, upper=text.upper(), lower=text.lower()
+    )
+
+
+def section_end_handle(_: HansardLine, state: HansardState) -> None:
+    state.section = HansardSection.END
+
+    if state.cache:
+        cache_insert(state.cache, state.hansard)
+
+
+def section_set(section: HansardSection) -> Callable[[HansardLine, HansardState], None]:
+    def section_handle(_: HansardLine, state: HansardState) -> None:
+        state.section = section
+
+    return section_handle
+
+
+def speakline_alternative_handle(line: HansardLine, state: HansardState) -> None:
+    state.cache = speakline_alternative_parse(state.cache, state.hansard, line.element)
 
-            elif check_is_section_start(element, section):
-                section = HansardSection.START
 
-            elif check_is_section_end(element, section):
-                section = HansardSection.END
+def speakline_handle(line: HansardLine, state: HansardState) -> None:
+    state.cache = speakline_parse(state.cache, state.hansard, line)
 
-                parsed = cache_insert(cache, parsed) if cache else parsed
 
-            elif check_is_event(element, section):
-                parsed = cache_insert(cache, parsed) if cache else parsed
+HANSARD_TRANSITION_OFFICER: HansardTransition = (
+    lambda line, _: check_is_officer_outside(line),
+    lambda line, state: officer_parse(state.hansard, line.element),
+)
+HANSARD_TRANSITION_DEBATE: tuple[HansardTransition, ...] = (
+    (
+        lambda line, _: check_is_event(line),
+        event_handle,
+    ),
+    HANSARD_TRANSITION_OFFICER,
+    (
+        lambda line, state: check_is_speakline(line, state.hansard),
+        speakline_handle,
+    ),
+    (
+        lambda line, _: check_is_speakline_alternative(line),
+        speakline_alternative_handle,
+    ),
+)
 
-            elif check_is_assembly_person(element, section):
-                parsed = assembly_person_parse(parsed, element, section)
+# the checks that can still match in each section, in their original order
+HANSARD_TRANSITIONS: dict[HansardSection, tuple[HansardTransition, ...]] = {
+    HansardSection.DOCUMENT_START: (
+        (
+            lambda line, _: check_is_section_present(line),
+            section_set(HansardSection.PRESENT),
+        ),
+        HANSARD_TRANSITION_OFFICER,
+    ),
+    HansardSection.PRESENT: (
+        (
+            lambda line, _: check_is_section_absent(line),
+            section_set(HansardSection.ABSENT),
+        ),
+        (
+            lambda line, _: check_is_assembly_person(line),
+            lambda line, state: assembly_person_parse(
+                state.hansard, line.element, state.section
+            ),
+        ),
+        (
+            lambda line, _: check_is_assembly_role(line),
+            lambda line, state: assembly_role_parse(
+                state.hansard, line.element, state.section
+            ),
+        ),
+        HANSARD_TRANSITION_OFFICER,
+    ),
+    HansardSection.ABSENT: (
+        (
+            lambda line, _: check_is_section_guest(line),
+            section_set(HansardSection.GUEST),
+        ),
+        (
+            lambda line, _: check_is_assembly_person(line),
+            lambda line, state: assembly_person_parse(
+                state.hansard, line.element, state.section
+            ),
+        ),
+        HANSARD_TRANSITION_OFFICER,
+    ),
+    HansardSection.GUEST: (
+        (
+            lambda line, _: check_is_section_officer(line),
+            section_set(HansardSection.OFFICER),
+        ),
+        (
+            lambda line, _: check_is_guest(line),
+            lambda line, state: guest_parse(state.hansard, line.element),
+        ),
+        HANSARD_TRANSITION_OFFICER,
+    ),
+    HansardSection.OFFICER: (
+        (
+            lambda line, _: check_is_section_start(line),
+            section_set(HansardSection.START),
+        ),
+        (
+            lambda line, _: check_is_officer(line),
+            lambda line, state: officer_parse(state.hansard, line.element),
+        ),
+    ),
+    HansardSection.START: (
+        (lambda line, _: check_is_section_end(line), section_end_handle),
+        *HANSARD_TRANSITION_DEBATE,
+        (
+            lambda line, state: state.cache is not None
+            and not check_is_answer_to_inquiry(line.element),
+            cache_append_handle,
+        ),
+    ),
+    HansardSection.SPEECH: HANSARD_TRANSITION_DEBATE,
+    HansardSection.QUESTION: HANSARD_TRANSITION_DEBATE,
+    HansardSection.ANSWER: HANSARD_TRANSITION_DEBATE,
+    HansardSection.END: (HANSARD_TRANSITION_OFFICER,),
+}
 
-            elif check_is_assembly_role(element, section):
-                parsed = assembly_role_parse(parsed, element, section)
 
-            elif check_is_guest(element, section):
-                parsed = guest_parse(parsed, element)
+def parse(
+    year: int, session: int, elements: Iterable[ExtractElement], source: str = ""
+) -> Hansard:
+    elements = iter(elements)
+    builder = HansardBuilder(
+        Meta(source=source, year=year, session=session, dun="selangor")
+    )
 
-            elif check_is_officer(element, section):
-                parsed = officer_parse(parsed, element)
+    # an empty extract makes an empty hansard, as it did before streaming
+    header = next(elements, None)
+    if header is None:
+        return builder.build()
 
-            elif check_is_speakline(element, section, parsed):
-                cache, parsed = speakline_parse(cache, parsed, element)
+    lines = (
+        line
+        for line in map(line_normalize, elements)
+        if not check_is_header(line, header) and not check_is_page_number(line)
+    )
 
-            elif check_is_speakline_alternative(element, section):
-                cache, parsed = speakline_alternative_parse(cache, parsed, element)
+    state = HansardState(builder)
 
-            elif (
-                section == HansardSection.START
-                and cache
-                and not check_is_answer_to_inquiry(element)
-            ):
-                cache = cache_append_element(cache, element)
+    for idx, line in enumerate(lines):
+        for check, handle in HANSARD_TRANSITIONS[state.section]:
+            if check(line, state):
+                handle(line, state)
+                break
 
-            elif int(os.environ.get("DEBUG", "0")) == 1:
+        else:
+            if int(os.environ.get("DEBUG", "0")) == 1:
                 logger.debug(
                     "Skipping element",
                     idx=idx,
-                    section=section,
-                    element=element,
-                    text=element.text,
+                    section=state.section,
+                    element=line.element,
+                    text=line.element.text,
                 )
 
-        parsed = akn_populate(parsed)
+    return state.hansard.build()
 
-        file_name = "{}/{}".format(
-            parse_path,
-            file_entry.name.replace(".pickle", ".json"),
-        )
 
-        logger.info(
-            f"Writing hansard to file {file_idx + 1}/{len(hansard_files)}",
-            source=file_entry.name,
-            parsed_inquiry=file_name,
-        )
-        with open(file_name, "w") as handle:
-            json.dump(typedload.dump(parsed), handle, indent=2)
\ No newline at end of file
+def parse_file(year: int, session: int, source: str, parse_path: Path) -> list[str]:
+    result = parse(year, session, store_read(source), source)
+
+    akn_name = f"{store_get_name(basename(source))}.akn.xml"
+    with open(f"{parse_path}/{akn_name}", "wb") as akn_file:
+        akn_write(result, akn_file)
+
+    file_name = "{}/{}".format(
+        parse_path,
+        f"{store_get_name(basename(source))}.json",
+    )
+
+    with open(file_name, "w") as handle:
+        codec_write(result._replace(akn_file=akn_name), handle)
+
+    return [file_name, f"{parse_path}/{akn_name}"]
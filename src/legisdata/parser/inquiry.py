@@ -1,40 +1,41 @@
-import json
-import os
 from pathlib import Path
+from posixpath import basename
+from typing import BinaryIO, Iterable, Iterator
 
 import structlog
-import typedload
 from lxml import builder, etree
-from unstructured.documents.elements import Element, ListItem, Title
 
+from legisdata.codec import codec_write
 from legisdata.parser.common import (
     check_is_answer_to_inquiry,
     check_is_oral_inquiry_heading,
     check_is_written_inquiry_heading,
     last_item_replace,
-    unpickler,
 )
 from legisdata.schema import ContentElement, Inquiry, Meta, Person
+from legisdata.store import ExtractElement, store_get_name, store_read
 
 logger = structlog.get_logger()
 
 
-def akn_populate(inquiry: Inquiry) -> Inquiry:
-    if not (inquiry.inquirer and inquiry.respondent):
-        return inquiry
+def akn_write(inquiry: Inquiry, akn_file: BinaryIO) -> None:
+    assert inquiry.inquirer and inquiry.respondent
 
     E = builder.ElementMaker()
 
-    return inquiry._replace(
-        akn=etree.tostring(
+    with etree.xmlfile(akn_file, encoding="utf-8") as xml_file:
+        xml_file.write_declaration()
+        xml_file.write(
             E.akomaNtoso(
                 E.debate(
                     E.debateBody(
                         E.debateSection(
                             E(
-                                "oralStatement"
-                                if inquiry.is_oral
-                                else "writtenStatement",
+                                (
+                                    "oralStatement"
+                                    if inquiry.is_oral
+                                    else "writtenStatement"
+                                ),
                                 E.question(
                                     E("from", inquiry.inquirer.name),
                                     *[
@@ -65,16 +66,15 @@ def akn_populate(inquiry: Inquiry) -> Inquiry:
                     )
                 )
             ),
-            pretty_print=True,  # type: ignore
-            xml_declaration=True,  # type: ignore
-            encoding="utf-8",  # type: ignore
-        ).decode("utf-8")
-    )
+            pretty_print=True,
+        )
 
 
-def check_is_new_content(inquiry: Inquiry, is_question: bool, element: Element) -> bool:
+def check_is_new_content(
+    inquiry: Inquiry, is_question: bool, element: ExtractElement
+) -> bool:
     return (
-        isinstance(element, ListItem)
+        element.type == "ListItem"
         or (is_question and not inquiry.inquiries)
         or (not is_question and not inquiry.responds)
     )
@@ -84,8 +84,8 @@ def check_is_respondent_mention(element) -> bool:
     return element.text.lower().find("bertanya kepada") in range(6)
 
 
-def check_is_title(element: Element) -> bool:
-    return isinstance(element, Title) and element.text.upper().startswith("TAJUK")
+def check_is_title(element: ExtractElement) -> bool:
+    return element.type == "Title" and element.text.upper().startswith("TAJUK")
 
 
 def content_append_element(
@@ -121,8 +121,8 @@ def content_insert_new(
 
 
 def create_new(
-    element: Element,
-    file_entry: os.DirEntry,
+    element: ExtractElement,
+    source: str,
     year: int,
     session: int,
     dun: str,
@@ -140,7 +140,7 @@ def create_new(
         ),
         is_oral=is_oral,
         meta=Meta(
-            source=file_entry.path,
+            source=source,
             year=year,
             session=session,
             dun=dun,
@@ -149,80 +149,86 @@ def create_new(
 
 
 def parse(
-    year: int,
-    session: int,
-    inquiry_files: tuple[os.DirEntry[str], ...],
-    parse_path: Path,
-) -> None:
-    for file_idx, (file_entry, elements) in enumerate(map(unpickler, inquiry_files)):
-        if not (
-            check_is_oral_inquiry_heading(elements[0])
-            or check_is_written_inquiry_heading(elements[0])
-        ):
-            logger.info(
-                f"Skipping non inquiry file {file_idx + 1}/{len(inquiry_files)}",
-                path=file_entry.path,
-            )
-            continue
+    year: int, session: int, elements: Iterable[ExtractElement], source: str = ""
+) -> Iterator[Inquiry]:
+    elements = iter(elements)
+
+    heading = next(elements, None)
+    if heading is None or not (
+        check_is_oral_inquiry_heading(heading)
+        or check_is_written_inquiry_heading(heading)
+    ):
+        return
+
+    current = create_new(
+        heading,
+        source,
+        year,
+        session,
+        "selangor",
+        check_is_oral_inquiry_heading(heading),
+    )
+    is_question = False
+    for element in elements:
+        # only the inquiry being read changes, the previous one is complete
+        if check_is_oral_inquiry_heading(element):
+            yield current
+            current = create_new(element, source, year, session, "selangor", True)
 
-        logger.info(
-            f"Parsing file {file_idx + 1}/{len(inquiry_files)}", path=file_entry.path
-        )
+        elif check_is_written_inquiry_heading(element):
+            yield current
+            current = create_new(element, source, year, session, "selangor", False)
 
-        parsed: list[Inquiry] = []
-        is_question = False
-        for idx, element in enumerate(elements):
-            if check_is_oral_inquiry_heading(element):
-                parsed.append(
-                    create_new(element, file_entry, year, session, "selangor", True)
-                )
+        elif check_is_title(element):
+            current = title_insert(current, element)
 
-            elif check_is_written_inquiry_heading(element):
-                parsed.append(
-                    create_new(element, file_entry, year, session, "selangor", False)
-                )
+        elif check_is_respondent_mention(element):
+            is_question = True
 
-            elif check_is_title(element):
-                parsed.append(title_insert(parsed.pop(), element))
+            current = respondent_insert(current, element)
 
-            elif check_is_respondent_mention(element):
-                is_question = True
+        elif check_is_answer_to_inquiry(element):
+            is_question = False
 
-                parsed.append(respondent_insert(parsed.pop(), element))
+        else:
+            item = ContentElement(
+                type=element.type.lower(),
+                value=element.text_as_html or element.text,
+                image=element.image,
+            )
 
-            elif check_is_answer_to_inquiry(element):
-                is_question = False
+            if check_is_new_content(current, is_question, element):
+                current = content_insert_new(current, item, is_question)
 
             else:
-                item = ContentElement(
-                    type=type(element).__name__.lower(),
-                    value=element.metadata.text_as_html or element.text,
-                    image=element.metadata.image_base64,
-                )
+                current = content_append_element(current, item, is_question)
 
-                if check_is_new_content(parsed[-1], is_question, element):
-                    parsed.append(content_insert_new(parsed.pop(), item, is_question))
+    yield current
 
-                else:
-                    parsed.append(
-                        content_append_element(parsed.pop(), item, is_question)
-                    )
 
-            parsed.append(akn_populate(parsed.pop()))
+def parse_file(year: int, session: int, source: str, parse_path: Path) -> list[str]:
+    result = []
+    for inquiry in parse(year, session, store_read(source), source):
+        # the markup is written once, from the finished inquiry
+        if inquiry.inquirer and inquiry.respondent:
+            akn_name = f"{store_get_name(basename(source))}.{inquiry.number}.akn.xml"
+            with open(f"{parse_path}/{akn_name}", "wb") as akn_file:
+                akn_write(inquiry, akn_file)
 
-        for idx, inquiry in enumerate(parsed):
-            file_name = "{}/{}".format(
-                parse_path,
-                file_entry.name.replace(".pickle", f".{inquiry.number}.json"),
-            )
+            inquiry = inquiry._replace(akn_file=akn_name)
+            result.append(f"{parse_path}/{akn_name}")
 
-            logger.info(
-                f"Writing inquiry to file {idx + 1}/{len(parsed)}",
-                source=file_entry.name,
-                parsed_inquiry=file_name,
-            )
-            with open(file_name, "w") as handle:
-                json.dump(typedload.dump(inquiry), handle, indent=2)
+        file_name = "{}/{}".format(
+            parse_path,
+            f"{store_get_name(basename(source))}.{inquiry.number}.json",
+        )
+
+        with open(file_name, "w") as handle:
+            codec_write(inquiry, handle)
+
+        result.append(file_name)
+
+    return result
 
 
 def respondent_insert(current: Inquiry, element) -> Inquiry:
@@ -237,4 +243,4 @@ def respondent_insert(current: Inquiry, element) -> Inquiry:
 def title_insert(current: Inquiry, element) -> Inquiry:
     return current._replace(
         title=element.text[element.text.find("TAJUK") + 5 :].strip(" :")
-    )
\ No newline at end of file
+    )
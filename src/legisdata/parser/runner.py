@@ -0,0 +1,220 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from fnmatch import fnmatch
+from functools import partial
+from hashlib import sha256
+from importlib.metadata import version
+from pathlib import Path
+from posixpath import basename
+from types import ModuleType
+from typing import Callable, Iterable, NamedTuple
+
+import structlog
+import typedload
+from typedload.exceptions import TypedloadException
+
+from legisdata import codec, schema, store
+from legisdata.common import ListingType
+from legisdata.parser import common, hansard, inquiry
+
+logger = structlog.get_logger()
+
+PARSE_MANIFEST_VERSION = 1
+
+PARSE_FILE: dict[ListingType, Callable[[int, int, str, Path], list[str]]] = {
+    ListingType.Hansard: hansard.parse_file,
+    ListingType.Inquiry: inquiry.parse_file,
+}
+
+# a change to any of these modules can change the parsed output of a listing
+PARSE_MODULES: dict[ListingType, tuple[ModuleType, ...]] = {
+    ListingType.Hansard: (hansard, common, codec, schema, store),
+    ListingType.Inquiry: (inquiry, common, codec, schema, store),
+}
+
+parse_fingerprints: dict[ListingType, str] = {}
+
+
+class ParseTask(NamedTuple):
+    listing_type: ListingType
+    source: str
+    target: Path
+    progress: str
+
+
+class ParseEntry(NamedTuple):
+    source: str
+    key: str
+    outputs: list[str]
+    parse_time: str | None = None
+
+
+class ParseManifestData(NamedTuple):
+    version: int = PARSE_MANIFEST_VERSION
+    entries: list[ParseEntry] = []
+
+
+class ParseManifest:
+    """Record of the extracts parsed in a session and the files written from them."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.entries: dict[str, ParseEntry] = {}
+
+        if path.exists():
+            # an unreadable manifest only costs a full parse
+            try:
+                with open(path) as manifest_file:
+                    data = typedload.load(json.load(manifest_file), ParseManifestData)
+            except (ValueError, TypedloadException):
+                data = ParseManifestData()
+
+            if data.version == PARSE_MANIFEST_VERSION:
+                self.entries = {entry.source: entry for entry in data.entries}
+
+    def __enter__(self) -> "ParseManifest":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.save()
+
+    def completed(self, source: str, key: str) -> bool:
+        entry = self.entries.get(source)
+
+        return (
+            entry is not None
+            and entry.key == key
+            and all(os.path.isfile(output) for output in entry.outputs)
+        )
+
+    def record(self, entry: ParseEntry) -> None:
+        previous = self.entries.get(entry.source)
+
+        # inquiries dropped by a parser change would otherwise linger
+        if previous is not None:
+            for output in set(previous.outputs) - set(entry.outputs):
+                if os.path.isfile(output):
+                    os.remove(output)
+
+        self.entries[entry.source] = entry._replace(parse_time=str(datetime.now()))
+
+    def save(self) -> None:
+        with open(f"{self.path}.tmp", "w") as manifest_file:
+            json.dump(
+                typedload.dump(ParseManifestData(entries=list(self.entries.values()))),
+                manifest_file,
+                indent=2,
+            )
+
+        os.replace(f"{self.path}.tmp", self.path)
+
+
+def parse_cache_key(task: ParseTask) -> str:
+    hasher = sha256()
+    with open(task.source, "rb") as source_file:
+        for chunk in iter(lambda: source_file.read(1 << 20), b""):
+            hasher.update(chunk)
+
+    return f"{hasher.hexdigest()}-{parse_fingerprint(task.listing_type)[:16]}"
+
+
+def parse_check_forced(task: ParseTask, force: tuple[str, ...]) -> bool:
+    return any(
+        fnmatch(basename(task.source), pattern) or pattern == task.listing_type.value
+        for pattern in force
+    )
+
+
+def parse_fingerprint(listing_type: ListingType) -> str:
+    if listing_type not in parse_fingerprints:
+        parse_fingerprints[listing_type] = sha256(
+            json.dumps(
+                {
+                    "modules": [
+                        sha256(Path(str(module.__file__)).read_bytes()).hexdigest()
+                        for module in PARSE_MODULES[listing_type]
+                    ],
+                    "lxml": version("lxml"),
+                    "typedload": version("typedload"),
+                },
+                sort_keys=True,
+            ).encode("utf-8")
+        ).hexdigest()
+
+    return parse_fingerprints[listing_type]
+
+
+def parse_record(
+    manifest: ParseManifest,
+    tasks: tuple[ParseTask, ...],
+    keys: dict[str, str],
+    results: Iterable[list[str]],
+) -> None:
+    for task, result in zip(tasks, results):
+        manifest.record(
+            ParseEntry(source=task.source, key=keys[task.source], outputs=result)
+        )
+
+        if not result:
+            logger.info(
+                f"Skipping non {task.listing_type.value} file {task.progress}",
+                file=task.source,
+            )
+            continue
+
+        logger.info(
+            f"Parsed {task.listing_type.value} file {task.progress}",
+            file=task.source,
+            written=len(result),
+        )
+
+
+def parse_run(
+    year: int,
+    session: int,
+    tasks: tuple[ParseTask, ...],
+    manifest_path: Path,
+    workers: int = 1,
+    force: tuple[str, ...] = (),
+) -> None:
+    with ParseManifest(manifest_path) as manifest:
+        keys = {task.source: parse_cache_key(task) for task in tasks}
+
+        pending = []
+        for task in tasks:
+            if not parse_check_forced(task, force) and manifest.completed(
+                task.source, keys[task.source]
+            ):
+                logger.info(
+                    f"Skipping unchanged {task.listing_type.value} file {task.progress}",
+                    file=task.source,
+                )
+                continue
+
+            pending.append(task)
+
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # map hands results back in submission order, so the log reads the
+                # same as a serial run
+                parse_record(
+                    manifest,
+                    tuple(pending),
+                    keys,
+                    executor.map(partial(parse_task, year, session), pending),
+                )
+
+        else:
+            parse_record(
+                manifest,
+                tuple(pending),
+                keys,
+                map(partial(parse_task, year, session), pending),
+            )
+
+
+def parse_task(year: int, session: int, task: ParseTask) -> list[str]:
+    # tasks only carry paths, os.DirEntry does not survive pickling
+    return PARSE_FILE[task.listing_type](year, session, task.source, task.target)
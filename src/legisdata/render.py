@@ -0,0 +1,132 @@
+import os
+from hashlib import sha256
+from itertools import groupby
+from pathlib import Path
+
+import pdf2image
+from PIL import Image
+from pypdf import PdfReader
+
+from legisdata.common import cache_get_path
+
+RENDER_CACHE_VERSION = 1
+
+render_convert_original = pdf2image.convert_from_path
+
+# shard files stand in for a page range of the original PDF
+render_aliases: dict[str, tuple[str, int]] = {}
+render_digests: dict[tuple[str, int, int], str] = {}
+
+
+def render_alias(path: str, source: str, offset: int) -> None:
+    render_aliases[path] = (source, offset)
+
+
+def render_alias_remove(path: str) -> None:
+    render_aliases.pop(path, None)
+
+
+def render_cache_install(enabled: bool = True) -> None:
+    # unstructured and unstructured_inference both rasterize through this function
+    pdf2image.convert_from_path = (
+        render_convert_cached if enabled else render_convert_original
+    )
+
+
+def render_cache_prune(max_size: int) -> int:
+    """Evict the least recently used pages until the cache fits in max_size MiB."""
+    pages = []
+    for root, _, files in os.walk(cache_get_path("render")):
+        for name in files:
+            stat = os.stat(os.path.join(root, name))
+            pages.append((stat.st_mtime_ns, stat.st_size, os.path.join(root, name)))
+
+    size, removed = sum(page[1] for page in pages), 0
+    for _, page_size, path in sorted(pages):
+        if size <= max_size << 20:
+            break
+
+        os.remove(path)
+        size -= page_size
+        removed += 1
+
+    return removed
+
+
+def render_convert_cached(
+    pdf_path: str | Path,
+    dpi: int = 200,
+    output_folder: str | Path | None = None,
+    first_page: int | None = None,
+    last_page: int | None = None,
+    paths_only: bool = False,
+    **kwargs,
+) -> list:
+    # formats, sizes and colour options change the image, so they skip the cache
+    if kwargs:
+        return render_convert_original(
+            pdf_path,
+            dpi=dpi,
+            output_folder=output_folder,
+            first_page=first_page,
+            last_page=last_page,
+            paths_only=paths_only,
+            **kwargs,
+        )
+
+    source, offset = render_aliases.get(str(pdf_path), (str(pdf_path), 0))
+    page_count = len(PdfReader(pdf_path).pages)
+    pages = range(first_page or 1, min(last_page or page_count, page_count) + 1)
+
+    cache_path = cache_get_path(
+        "render", f"v{RENDER_CACHE_VERSION}", render_digest(source), str(dpi)
+    )
+    missing = []
+    for page in pages:
+        # a hit refreshes the page, so pruning evicts the least recently used
+        try:
+            os.utime(cache_path / f"{page + offset}.png")
+
+        except FileNotFoundError:
+            missing.append(page)
+
+    os.makedirs(cache_path, exist_ok=True)
+
+    # render each run of consecutive missing pages in one poppler call
+    for _, run in groupby(enumerate(missing), lambda item: item[1] - item[0]):
+        run_pages = [page for _, page in run]
+
+        for page, image in zip(
+            run_pages,
+            render_convert_original(
+                pdf_path, dpi=dpi, first_page=run_pages[0], last_page=run_pages[-1]
+            ),
+        ):
+            # png is lossless, so OCR sees exactly the pixels poppler rendered
+            image.save(f"{cache_path / str(page + offset)}.{os.getpid()}.png")
+            os.replace(
+                f"{cache_path / str(page + offset)}.{os.getpid()}.png",
+                cache_path / f"{page + offset}.png",
+            )
+
+    if paths_only:
+        return [str(cache_path / f"{page + offset}.png") for page in pages]
+
+    return [
+        Image.open(cache_path / f"{page + offset}.png").convert("RGB") for page in pages
+    ]
+
+
+def render_digest(path: str) -> str:
+    stat = os.stat(path)
+    key = (os.path.realpath(path), stat.st_mtime_ns, stat.st_size)
+
+    if key not in render_digests:
+        hasher = sha256()
+        with open(path, "rb") as pdf_file:
+            for chunk in iter(lambda: pdf_file.read(1 << 20), b""):
+                hasher.update(chunk)
+
+        render_digests[key] = hasher.hexdigest()
+
+    return render_digests[key]
@@ -13,6 +13,7 @@ class Person(NamedTuple):
 class ContentElement(NamedTuple):
     type: str
     value: str
+    # sha256 digest of the image in the blob store (data/blob)
     image: None | str
 
 
@@ -34,6 +35,8 @@ class Inquiry(NamedTuple):
     inquiries: list[list[ContentElement]] = []
     responds: list[list[ContentElement]] = []
     akn: str | None = None
+    # Akoma Ntoso file written next to the JSON, replacing the inline akn
+    akn_file: str | None = None
 
 
 class Speech(NamedTuple):
@@ -67,6 +70,8 @@ class Hansard(NamedTuple):
     officer: list[Person] = []
     debate: list[Speech | Questions] = []
     akn: str | None = None
+    # Akoma Ntoso file written next to the JSON, replacing the inline akn
+    akn_file: str | None = None
 
 
 class HansardCache(NamedTuple):
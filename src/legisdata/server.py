@@ -0,0 +1,74 @@
+import json
+import os
+import socketserver
+import time
+from pathlib import Path
+
+import structlog
+import typedload
+
+from legisdata.client import SERVER_SOCKET, ServerRequest, ServerResponse
+from legisdata.extractor import extract_run, extract_worker_init
+from legisdata.task import ExtractConfig
+
+logger = structlog.get_logger()
+
+
+class ServerHandler(socketserver.StreamRequestHandler):
+    """Runs one extraction request per connection with the models already loaded."""
+
+    def handle(self) -> None:
+        time_start = time.monotonic()
+
+        try:
+            request = typedload.load(json.loads(self.rfile.readline()), ServerRequest)
+
+            # the blob store and session paths are relative to the project
+            if os.path.realpath(request.cwd) != os.getcwd():
+                raise ValueError(f"Server is running in {os.getcwd()}")
+
+            logger.info("Received extraction request", tasks=len(request.tasks))
+
+            # already warm in this process, a pool would load the models again
+            extract_run(
+                tuple(request.tasks),
+                request.config._replace(
+                    workers=1, max_tasks_per_worker=0, max_memory=0
+                ),
+                Path(request.metrics_path),
+                Path(request.journal_path),
+            )
+            response = ServerResponse(
+                status="done", duration=time.monotonic() - time_start
+            )
+
+        except Exception as error:
+            logger.exception("Extraction request failed")
+            response = ServerResponse(
+                status="error",
+                error=f"{type(error).__name__}: {error}",
+                duration=time.monotonic() - time_start,
+            )
+
+        self.wfile.write(f"{json.dumps(typedload.dump(response))}\n".encode("utf-8"))
+
+
+def server_run(config: ExtractConfig, socket_path: Path = SERVER_SOCKET) -> None:
+    logger.info("Loading extraction models", strategy=config.strategy)
+    extract_worker_init(config._replace(max_memory=0))
+
+    os.makedirs(socket_path.parent, exist_ok=True)
+    if socket_path.exists():
+        os.remove(socket_path)
+
+    with socketserver.UnixStreamServer(str(socket_path), ServerHandler) as server:
+        logger.info("Serving extraction requests", socket=str(socket_path))
+
+        try:
+            server.serve_forever()
+
+        except KeyboardInterrupt:
+            pass
+
+        finally:
+            os.remove(socket_path)
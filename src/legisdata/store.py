@@ -0,0 +1,137 @@
+import json
+import mmap
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Iterable, Iterator, NamedTuple
+
+from legisdata.blob import blob_reference
+
+STORE_FORMAT = "legisdata-elements"
+STORE_VERSION = 2
+# version 1 stores are still read, their base64 images are moved to the blob store
+STORE_VERSION_SUPPORTED = (1, 2)
+STORE_SUFFIX = ".elements.jsonl"
+STORE_LEGACY_SUFFIX = ".pickle"
+
+
+class ExtractElement(NamedTuple):
+    type: str
+    text: str
+    text_as_html: str | None = None
+    page_number: int | None = None
+    image: str | None = None
+
+
+def element_convert(element: Any) -> ExtractElement:
+    # accepts unstructured elements without importing unstructured
+    return (
+        element
+        if isinstance(element, ExtractElement)
+        else ExtractElement(
+            type=type(element).__name__,
+            text=element.text,
+            text_as_html=element.metadata.text_as_html,
+            page_number=element.metadata.page_number,
+            image=blob_reference(element.metadata.image_base64),
+        )
+    )
+
+
+def store_check_name(name: str) -> bool:
+    return name.endswith(STORE_SUFFIX) or name.endswith(STORE_LEGACY_SUFFIX)
+
+
+def store_get_name(name: str) -> str:
+    return name.removesuffix(STORE_SUFFIX).removesuffix(STORE_LEGACY_SUFFIX)
+
+
+def store_list(path: str | os.PathLike) -> list[str]:
+    names = {
+        target.name: target.path
+        for target in os.scandir(path)
+        if target.is_file() and store_check_name(target.name)
+    }
+
+    # one extract per PDF, a store supersedes the pickle it was re-extracted from
+    return [
+        names[name]
+        for name in sorted(names)
+        if not (
+            name.endswith(STORE_LEGACY_SUFFIX)
+            and f"{store_get_name(name)}{STORE_SUFFIX}" in names
+        )
+    ]
+
+
+def store_read(path: str | os.PathLike) -> Iterator[ExtractElement]:
+    if str(path).endswith(STORE_LEGACY_SUFFIX):
+        with open(path, "rb") as legacy_file:
+            yield from (
+                element_convert(element) for element in pickle.load(legacy_file)
+            )
+
+        return
+
+    with open(path, "rb") as store_file:
+        # a store always has its header, and an empty file cannot be mapped
+        if os.fstat(store_file.fileno()).st_size == 0:
+            raise ValueError(f"Unsupported element store {path}")
+
+        with mmap.mmap(store_file.fileno(), 0, access=mmap.ACCESS_READ) as store_map:
+            header = json.loads(store_map.readline())
+
+            if (
+                header.get("format") != STORE_FORMAT
+                or header.get("version") not in STORE_VERSION_SUPPORTED
+            ):
+                raise ValueError(f"Unsupported element store {path}")
+
+            for line in iter(store_map.readline, b""):
+                element = ExtractElement(*json.loads(line))
+
+                yield (
+                    element._replace(image=blob_reference(element.image))
+                    if header["version"] == 1
+                    else element
+                )
+
+
+def store_remove_legacy(path: str | os.PathLike) -> None:
+    legacy_path = f"{store_get_name(str(path))}{STORE_LEGACY_SUFFIX}"
+
+    if os.path.exists(legacy_path):
+        os.remove(legacy_path)
+
+
+def store_write(path: str | os.PathLike, elements: Iterable[Any]) -> int:
+    count = 0
+
+    with open(f"{path}.tmp", "w", encoding="utf-8") as store_file:
+        store_file.write(
+            "{}\n".format(
+                json.dumps(
+                    {
+                        "format": STORE_FORMAT,
+                        "version": STORE_VERSION,
+                        "fields": ExtractElement._fields,
+                    }
+                )
+            )
+        )
+
+        for element in elements:
+            store_file.write(
+                "{}\n".format(
+                    json.dumps(
+                        tuple(element_convert(element)),
+                        ensure_ascii=False,
+                        separators=(",", ":"),
+                    )
+                )
+            )
+            count += 1
+
+    os.replace(f"{path}.tmp", Path(path))
+
+    return count
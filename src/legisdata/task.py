@@ -0,0 +1,23 @@
+from typing import NamedTuple
+
+
+class ExtractConfig(NamedTuple):
+    languages: tuple[str, ...] = ("msa", "eng")
+    strategy: str = "hi_res"
+    image_block_types: tuple[str, ...] = ("Image", "Table")
+    workers: int = 1
+    pages_per_shard: int = 0
+    cache: bool = True
+    resume: bool = False
+    max_tasks_per_worker: int = 0
+    max_memory: int = 0
+    render_cache: int = 0
+
+
+class ExtractTask(NamedTuple):
+    source: str
+    target: str
+    progress: str
+
+
+EXTRACT_DEFAULT = ExtractConfig()
@@ -1,3 +1,12 @@
+export function blobGetUrl(digest: string | null) {
+  // rows imported before the blob store may still hold the base64 payload
+  if (digest && !/^[0-9a-f]{64}$/.test(digest)) {
+    return "data:image/jpeg;base64, ".concat(digest);
+  }
+
+  return "/api/blob/".concat(digest || "");
+}
+
 export function contentGenerateId(
   contentType: string,
   contentId: number,
@@ -6,7 +6,7 @@ import Row from "react-bootstrap/Row";
 import { useSelector } from "react-redux";
 import { useLoaderData } from "react-router-dom";
 import type { RootState } from "../app/store";
-import { contentGenerateId } from "../common";
+import { blobGetUrl, contentGenerateId } from "../common";
 import Avatar from "../components/avatar";
 import SpeakLineControl from "../components/snippet-control";
 import type * as Schema from "../schema";
@@ -93,7 +93,7 @@ function SpeakLine({
               ) : (
                 <Image
                   fluid
-                  src={"data:image/jpeg;base64, ".concat(content.image || "")}
+                  src={blobGetUrl(content.image)}
                 />
               )}
             </Card.Body>
@@ -2,7 +2,7 @@ import { Badge, Col, Image, ListGroup, Row } from "react-bootstrap";
 import { useSelector } from "react-redux";
 import { useLoaderData } from "react-router-dom";
 import { RootState } from "../app/store";
-import { contentGenerateId } from "../common";
+import { blobGetUrl, contentGenerateId } from "../common";
 import Avatar from "../components/avatar";
 import SpeakSnippetControl from "../components/snippet-control";
 import * as Schema from "../schema";
@@ -40,7 +40,7 @@ function SpeakSnippet({
       ) : (
         <Image
           fluid
-          src={"data:image/jpeg;base64, ".concat(content.image || "")}
+          src={blobGetUrl(content.image)}
         />
       )}
     </ListGroup.Item>
@@ -1,11 +1,21 @@
 import json
 import os
+from pathlib import Path
+from typing import Any, Iterator
 
 import structlog
-import typedload
 from django.db import transaction
 from django_typer.management import TyperCommand
 from legisdata import schema
+from legisdata.blob import blob_read, blob_reference
+from legisdata.bundle import (
+    BUNDLE_SUFFIX,
+    bundle_check,
+    bundle_get_path,
+    bundle_index_read,
+    bundle_iter,
+)
+from legisdata.codec import codec_load
 from legisdata.common import (
     ListingClass,
     ListingType,
@@ -27,32 +37,28 @@ class Command(TyperCommand):
         hansard_path = data_get_path(path_base, ListingType.Hansard, ListingClass.PARSE)
         inquiry_path = data_get_path(path_base, ListingType.Inquiry, ListingClass.PARSE)
 
-        assert archive_exists(hansard_path, inquiry_path)
-
-        import_hansard(
-            year,
-            session,
-            [target for target in os.scandir(hansard_path) if target.is_file()],
-        )
-        import_inquiry(
-            year,
-            session,
-            [target for target in os.scandir(inquiry_path) if target.is_file()],
+        # a bundle downloaded from huggingface comes without the parse directory
+        assert all(
+            archive_exists(parse_path) or bundle_check(parse_path)
+            for parse_path in (hansard_path, inquiry_path)
         )
 
+        import_hansard(year, session, *import_documents(hansard_path, schema.Hansard))
+        import_inquiry(year, session, *import_documents(inquiry_path, schema.Inquiry))
+
 
 @transaction.atomic
-def import_hansard(year: int, session: int, hansard_list: list[os.DirEntry]) -> None:
-    for idx_file, _hansard_file in enumerate(hansard_list):
-        logger.info(
-            f"Importing hansard {idx_file + 1}/{len(hansard_list)}",
-            path=_hansard_file.path,
-        )
-        with open(_hansard_file) as hansard_file:
-            hansard = typedload.load(json.load(hansard_file), schema.Hansard)
+def import_hansard(
+    year: int,
+    session: int,
+    count: int,
+    hansard_list: Iterator[tuple[str, schema.Hansard, str | None]],
+) -> None:
+    for idx_file, (path, hansard, akn) in enumerate(hansard_list):
+        logger.info(f"Importing hansard {idx_file + 1}/{count}", path=path)
 
         record = models.Hansard.objects.create(
-            akn=hansard.akn,
+            akn=akn,
         )
         record.present.add(*[import_person(person) for person in hansard.present])
         record.absent.add(*[import_person(person) for person in hansard.absent])
@@ -73,7 +79,7 @@ def import_hansard(year: int, session: int, hansard_list: list[os.DirEntry]) ->
                         speech=speech,
                         value=content.value,
                         type=content.type,
-                        image=content.image,
+                        image=import_blob(content.image),
                     )
 
             else:
@@ -97,7 +103,7 @@ def import_hansard(year: int, session: int, hansard_list: list[os.DirEntry]) ->
                                 question=question,
                                 value=content.value,
                                 type=content.type,
-                                image=content.image,
+                                image=import_blob(content.image),
                             )
 
                     else:
@@ -114,20 +120,20 @@ def import_hansard(year: int, session: int, hansard_list: list[os.DirEntry]) ->
                                 answer=answer,
                                 value=content.value,
                                 type=content.type,
-                                image=content.image,
+                                image=import_blob(content.image),
                             )
 
         record.save()
 
 
-def import_inquiry(year: int, session: int, inquiry_list: list[os.DirEntry]) -> None:
-    for idx_file, _inquiry_file in enumerate(inquiry_list):
-        logger.info(
-            f"Importing inquiry {idx_file + 1}/{len(inquiry_list)}",
-            path=_inquiry_file.path,
-        )
-        with open(_inquiry_file) as inquiry_file:
-            inquiry = typedload.load(json.load(inquiry_file), schema.Inquiry)
+def import_inquiry(
+    year: int,
+    session: int,
+    count: int,
+    inquiry_list: Iterator[tuple[str, schema.Inquiry, str | None]],
+) -> None:
+    for idx_file, (path, inquiry, akn) in enumerate(inquiry_list):
+        logger.info(f"Importing inquiry {idx_file + 1}/{count}", path=path)
 
         assert inquiry.inquirer and inquiry.respondent
 
@@ -137,7 +143,7 @@ def import_inquiry(year: int, session: int, inquiry_list: list[os.DirEntry]) ->
             respondent=import_person(inquiry.respondent),
             number=inquiry.number,
             title=inquiry.title,
-            akn=inquiry.akn,
+            akn=akn,
         )
 
         for idx_list, item in enumerate(inquiry.inquiries):
@@ -151,7 +157,7 @@ def import_inquiry(year: int, session: int, inquiry_list: list[os.DirEntry]) ->
                     container_list=container_list,
                     value=content.value,
                     type=content.type,
-                    image=content.image,
+                    image=import_blob(content.image),
                 )
 
         for idx_list, item in enumerate(inquiry.responds):
@@ -165,10 +171,56 @@ def import_inquiry(year: int, session: int, inquiry_list: list[os.DirEntry]) ->
                     container_list=container_list,
                     value=content.value,
                     type=content.type,
-                    image=content.image,
+                    image=import_blob(content.image),
                 )
 
 
+def import_akn(akn: str | None, akn_file: str | None, path: str) -> str | None:
+    # older parsed files carry the markup itself
+    if akn_file is None:
+        return akn
+
+    with open(
+        os.path.join(os.path.dirname(path), akn_file), encoding="utf-8"
+    ) as xml_file:
+        return xml_file.read()
+
+
+def import_documents(
+    parse_path: Path, type_: type
+) -> tuple[int, Iterator[tuple[str, Any, str | None]]]:
+    # a bundled listing is read sequentially, without scanning the directory
+    if bundle_check(parse_path):
+        return len(bundle_index_read(parse_path)), (
+            (f"{bundle_get_path(parse_path, BUNDLE_SUFFIX)}:{name}", value, akn)
+            for name, value, akn in bundle_iter(parse_path, type_)
+        )
+
+    targets = [
+        target.path
+        for target in os.scandir(parse_path)
+        if target.is_file() and target.name.endswith(".json")
+    ]
+
+    return len(targets), (import_file(target, type_) for target in targets)
+
+
+def import_file(path: str, type_: type) -> tuple[str, Any, str | None]:
+    with open(path) as parse_file:
+        value = codec_load(json.load(parse_file), type_)
+
+    return path, value, import_akn(value.akn, value.akn_file, path)
+
+
+def import_blob(image: str | None) -> str | None:
+    digest = blob_reference(image)
+
+    if digest and not models.Blob.objects.filter(digest=digest).exists():
+        models.Blob.objects.create(digest=digest, data=blob_read(digest))
+
+    return digest
+
+
 def import_person(person: schema.Person) -> models.Person:
     return models.Person.objects.get_or_create(
         identifier="".join(c.lower() for c in person.raw if c.isalpha()),
@@ -0,0 +1,65 @@
+import base64
+from hashlib import sha256
+
+from django.db import migrations
+from legisdata.blob import BLOB_DIGEST
+
+CONTENT_MODELS = (
+    "SpeechContent",
+    "QuestionContent",
+    "AnswerContent",
+    "InquiryContent",
+    "RespondContent",
+)
+
+
+def image_to_blob(apps, schema_editor):
+    Blob = apps.get_model("legisweb_viewer", "Blob")
+
+    # rows imported before the blob store still carry the base64 payload
+    for model_name in CONTENT_MODELS:
+        model = apps.get_model("legisweb_viewer", model_name)
+
+        for pk in list(
+            model.objects.exclude(image=None)
+            .exclude(image__regex=BLOB_DIGEST.pattern)
+            .values_list("pk", flat=True)
+        ):
+            data = base64.b64decode(
+                model.objects.values_list("image", flat=True).get(pk=pk)
+            )
+            digest = sha256(data).hexdigest()
+
+            Blob.objects.get_or_create(digest=digest, defaults={"data": data})
+            model.objects.filter(pk=pk).update(image=digest)
+
+
+def blob_to_image(apps, schema_editor):
+    Blob = apps.get_model("legisweb_viewer", "Blob")
+
+    # the blob table goes away with 0002, so inline the payloads again
+    for model_name in CONTENT_MODELS:
+        model = apps.get_model("legisweb_viewer", model_name)
+
+        for pk, digest in list(
+            model.objects.filter(image__regex=BLOB_DIGEST.pattern).values_list(
+                "pk", "image"
+            )
+        ):
+            blob = Blob.objects.filter(digest=digest).first()
+
+            if blob is not None:
+                model.objects.filter(pk=pk).update(
+                    image=base64.b64encode(bytes(blob.data)).decode("ascii")
+                )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("legisweb_viewer", "0002_blob"),
+    ]
+
+    operations = [
+        migrations.RunPython(image_to_blob, blob_to_image),
+    ]
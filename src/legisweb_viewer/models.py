@@ -3,10 +3,16 @@ from itertools import chain
 from django.db import models
 
 
+class Blob(models.Model):
+    digest = models.CharField(max_length=64, primary_key=True)
+    data = models.BinaryField()
+
+
 class ContentElement(models.Model):
     idx = models.IntegerField()
     type = models.CharField()
     value = models.TextField()
+    # sha256 digest of the image, served by the blob endpoint
     image = models.TextField(null=True)
 
     class Meta:
@@ -10,6 +10,7 @@ router.register(r"inquiry", views.InquiryViewSet, basename="inquiry")
 router.register(r"hansard", views.HansardViewSet, basename="hansard")
 
 urlpatterns = [
+    path("blob/<str:digest>", views.blob),
     path("", include(router.urls)),
 ]
 
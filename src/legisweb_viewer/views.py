@@ -1,5 +1,8 @@
 from typing import NamedTuple
 
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.request import Request
@@ -14,7 +17,7 @@ from legisweb_viewer.documents import (
     RespondContentDocument,
     SpeechContentDocument,
 )
-from legisweb_viewer.models import Hansard, Inquiry, Person
+from legisweb_viewer.models import Blob, Hansard, Inquiry, Person
 from legisweb_viewer.serializers import (
     AnswerContentSearchSerializer,
     HansardSerializer,
@@ -47,6 +50,18 @@ class HansardViewSet(ReadOnlyModelViewSet):
     queryset = Hansard.objects.all()
     serializer_class = HansardSerializer
 
+
+@require_GET
+def blob(request: HttpRequest, digest: str) -> HttpResponse:
+    record = get_object_or_404(Blob, digest=digest)
+
+    response = HttpResponse(bytes(record.data), content_type="image/jpeg")
+    # blobs are addressed by their checksum, so they never change
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+
+    return response
+
+
 @api_view(["GET"])
 def search(request: Request, format=None) -> Response:
     result = None
@@ -0,0 +1,195 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import typedload
+
+from legisdata import schema
+from legisdata.bundle import (
+    BUNDLE_AKN_SUFFIX,
+    BUNDLE_INDEX_SUFFIX,
+    BUNDLE_SUFFIX,
+    BUNDLE_VERSION,
+    bundle_check,
+    bundle_get_path,
+    bundle_index_read,
+    bundle_iter,
+    bundle_pack,
+    bundle_read,
+    bundle_remove,
+)
+from legisdata.codec import codec_write
+
+META = schema.Meta(
+    source="SOALAN-1.pdf", year=2020, session=2, dun="selangor", parse_time="now"
+)
+MEMBER = schema.Person(name="Ahmad", raw="AHMAD")
+
+
+def inquiry_make(number: int) -> schema.Inquiry:
+    return schema.Inquiry(
+        meta=META,
+        inquirer=MEMBER,
+        respondent=MEMBER,
+        number=number,
+        title=f"Soalan {number} – jalan",
+        inquiries=[[schema.ContentElement(type="Title", value="a)", image=None)]],
+    )
+
+
+class BundleTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.parse_path = Path(self.directory.name, "inquiry-parse")
+        os.makedirs(self.parse_path)
+
+        # written by the parser, with the markup in a file next to the JSON
+        self.expected = {}
+        for number in (1, 2, 10):
+            name = f"SOALAN-1.pdf.{number}"
+            akn = f"<akomaNtoso>{number} – ü</akomaNtoso>"
+            (self.parse_path / f"{name}.akn.xml").write_text(akn, encoding="utf-8")
+
+            inquiry = inquiry_make(number)
+            with open(self.parse_path / f"{name}.json", "w") as parse_file:
+                codec_write(inquiry._replace(akn_file=f"{name}.akn.xml"), parse_file)
+
+            self.expected[name] = (inquiry, akn)
+
+        # an older typedload file with the markup inline, and one without markup
+        with open(self.parse_path / "SOALAN-0.pdf.3.json", "w") as parse_file:
+            json.dump(
+                typedload.dump(inquiry_make(3)._replace(akn="<akomaNtoso/>")),
+                parse_file,
+            )
+        self.expected["SOALAN-0.pdf.3"] = (inquiry_make(3), "<akomaNtoso/>")
+
+        with open(self.parse_path / "SOALAN-0.pdf.4.json", "w") as parse_file:
+            codec_write(inquiry_make(4)._replace(respondent=None), parse_file)
+        self.expected["SOALAN-0.pdf.4"] = (
+            inquiry_make(4)._replace(respondent=None),
+            None,
+        )
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_roundtrip(self) -> None:
+        self.assertFalse(bundle_check(self.parse_path))
+        self.assertEqual(bundle_pack(self.parse_path, schema.Inquiry), 5)
+        self.assertTrue(bundle_check(self.parse_path))
+
+        result = {
+            name: (value, akn)
+            for name, value, akn in bundle_iter(self.parse_path, schema.Inquiry)
+        }
+
+        self.assertEqual(result, self.expected)
+        self.assertEqual(
+            [entry.name for entry in bundle_index_read(self.parse_path)],
+            sorted(self.expected),
+        )
+
+    def test_read_entry(self) -> None:
+        bundle_pack(self.parse_path, schema.Inquiry)
+
+        for name in ("SOALAN-1.pdf.10", "SOALAN-0.pdf.4", "SOALAN-1.pdf.1"):
+            self.assertEqual(
+                bundle_read(self.parse_path, name, schema.Inquiry),
+                self.expected[name],
+            )
+
+        with self.assertRaises(KeyError):
+            bundle_read(self.parse_path, "SOALAN-1.pdf.99", schema.Inquiry)
+
+    def test_index_offsets(self) -> None:
+        bundle_pack(self.parse_path, schema.Inquiry)
+
+        bundle = bundle_get_path(self.parse_path, BUNDLE_SUFFIX).read_bytes()
+        akn = bundle_get_path(self.parse_path, BUNDLE_AKN_SUFFIX).read_bytes()
+
+        # one document per line, and the offsets land exactly on each of them
+        entries = bundle_index_read(self.parse_path)
+        self.assertEqual(len(bundle.splitlines()), len(entries))
+        for entry in entries:
+            line = bundle[entry.offset : entry.offset + entry.length]
+            self.assertEqual(bundle[entry.offset + entry.length], ord("\n"))
+            self.assertEqual(json.loads(line)["data"][3][1], MEMBER.name)
+
+            if entry.akn_offset is None or entry.akn_length is None:
+                self.assertIsNone(self.expected[entry.name][1])
+                continue
+
+            self.assertEqual(
+                akn[entry.akn_offset : entry.akn_offset + entry.akn_length].decode(
+                    "utf-8"
+                ),
+                self.expected[entry.name][1],
+            )
+
+    def test_repack(self) -> None:
+        bundle_pack(self.parse_path, schema.Inquiry)
+
+        os.remove(self.parse_path / "SOALAN-0.pdf.3.json")
+        del self.expected["SOALAN-0.pdf.3"]
+
+        self.assertEqual(bundle_pack(self.parse_path, schema.Inquiry), 4)
+        self.assertEqual(
+            {
+                name: (value, akn)
+                for name, value, akn in bundle_iter(self.parse_path, schema.Inquiry)
+            },
+            self.expected,
+        )
+
+    def test_stale_version(self) -> None:
+        bundle_pack(self.parse_path, schema.Inquiry)
+
+        index_path = bundle_get_path(self.parse_path, BUNDLE_INDEX_SUFFIX)
+        index = json.loads(index_path.read_text())
+        index["version"] = BUNDLE_VERSION + 1
+        index_path.write_text(json.dumps(index))
+
+        with self.assertRaises(ValueError):
+            bundle_read(self.parse_path, "SOALAN-1.pdf.1", schema.Inquiry)
+
+    def test_partial(self) -> None:
+        bundle_pack(self.parse_path, schema.Inquiry)
+
+        # interrupted once the new data is in place, before the new index is
+        replace, targets = os.replace, []
+
+        def replace_interrupted(source: str, target: Path) -> None:
+            targets.append(target)
+            if len(targets) > 1:
+                raise OSError("interrupted")
+
+            replace(source, target)
+
+        with (
+            mock.patch("legisdata.bundle.os.replace", replace_interrupted),
+            self.assertRaises(OSError),
+        ):
+            bundle_pack(self.parse_path, schema.Inquiry)
+
+        # the old index is gone rather than pointing into the new data
+        self.assertEqual(targets[0], bundle_get_path(self.parse_path, BUNDLE_SUFFIX))
+        self.assertFalse(bundle_check(self.parse_path))
+
+    def test_remove(self) -> None:
+        bundle_pack(self.parse_path, schema.Inquiry)
+        bundle_remove(self.parse_path)
+
+        self.assertFalse(bundle_check(self.parse_path))
+        for suffix in (BUNDLE_SUFFIX, BUNDLE_AKN_SUFFIX, BUNDLE_INDEX_SUFFIX):
+            self.assertFalse(bundle_get_path(self.parse_path, suffix).exists())
+
+        # and removing a bundle that is not there is fine
+        bundle_remove(self.parse_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+from legisdata.catalog import catalog_get, catalog_load, catalog_select
+from legisdata.common import LISTING_SOURCES
+from legisdata.crawler import FETCH_DEFAULT, Fetcher, fixture_path
+
+SITE = {2020: 3, 2021: 2}
+
+
+def session_get_url(css_class: str, year: int, session: int) -> str:
+    return f"https://dewan.selangor.gov.my/{css_class}/{year}/{session}/"
+
+
+class CatalogTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name, "catalog.json")
+
+        # saved pages of both listings, each session with one document
+        fixtures = Path(self.directory.name, "site")
+        os.makedirs(fixtures)
+        for source in LISTING_SOURCES:
+            fixture_path(fixtures, source.index_url).write_text(
+                '<div class="{0}-items">{1}</div>'.format(
+                    source.css_class,
+                    "".join(
+                        f'<div class="{source.css_class}-item"><h4>{year}</h4>'
+                        '<ul class="list-attachment">{}</ul></div>'.format(
+                            "".join(
+                                '<li><a href="{}">Sesi {}</a></li>'.format(
+                                    session_get_url(source.css_class, year, session),
+                                    session,
+                                )
+                                for session in range(1, count + 1)
+                            )
+                        )
+                        for year, count in SITE.items()
+                    ),
+                )
+            )
+
+            for year, count in SITE.items():
+                for session in range(1, count + 1):
+                    url = session_get_url(source.css_class, year, session)
+                    fixture_path(fixtures, url).write_text(
+                        f'<div class="entry-content"><p class="{source.file_p_class}">'
+                        f'<a href="{url}document.pdf">Dokumen</a></p></div>'
+                    )
+
+        patcher = mock.patch.dict(
+            os.environ, {"LEGISDATA_SITE_FIXTURES": str(fixtures)}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def catalog_get(self, **kwargs) -> list[str]:
+        with (
+            Fetcher(FETCH_DEFAULT) as fetcher,
+            ThreadPoolExecutor(2) as executor,
+            mock.patch.object(fetcher, "get_text", wraps=fetcher.get_text) as get_text,
+        ):
+            catalog_get(fetcher, executor, LISTING_SOURCES, path=self.path, **kwargs)
+
+        # the session pages fetched, the index pages are always read
+        return sorted(
+            call.args[0]
+            for call in get_text.call_args_list
+            if call.args[0] not in {source.index_url for source in LISTING_SOURCES}
+        )
+
+    def test_selection(self) -> None:
+        self.assertEqual(
+            self.catalog_get(years={2020}, sessions={2}),
+            sorted(
+                session_get_url(source.css_class, 2020, 2) for source in LISTING_SOURCES
+            ),
+        )
+
+        catalog = catalog_load(self.path)
+        assert catalog
+
+        # every session is listed, only the selected one with its documents
+        self.assertEqual(
+            [len(listing.years[0].sessions) for listing in catalog.listings], [3, 3]
+        )
+        self.assertEqual(
+            [
+                (listing.source.listing_type, listing.year, listing.session, files)
+                for listing, files in catalog_select(
+                    catalog, LISTING_SOURCES, None, None
+                )
+            ],
+            [
+                (
+                    source.listing_type,
+                    2020,
+                    2,
+                    [f"{session_get_url(source.css_class, 2020, 2)}document.pdf"],
+                )
+                for source in LISTING_SOURCES
+            ],
+        )
+
+    def test_selection_cached(self) -> None:
+        self.catalog_get(years={2020}, sessions={2})
+
+        self.assertEqual(self.catalog_get(years={2020}, sessions={2}), [])
+        self.assertEqual(
+            self.catalog_get(years={2020}, sessions={1, 2}),
+            sorted(
+                session_get_url(source.css_class, 2020, 1) for source in LISTING_SOURCES
+            ),
+        )
+
+        catalog = catalog_load(self.path)
+        assert catalog
+        self.assertEqual(len(catalog_select(catalog, LISTING_SOURCES, {2020}, None)), 4)
+
+    def test_full(self) -> None:
+        self.catalog_get(years={2020}, sessions={2})
+
+        # the catalog command fills in everything a download left out
+        self.assertEqual(
+            len(self.catalog_get(refresh=True)), 2 * (sum(SITE.values()) - 1)
+        )
+        self.assertEqual(self.catalog_get(), [])
+
+        # and after that only the latest year is fetched again
+        self.assertEqual(
+            self.catalog_get(refresh=True),
+            sorted(
+                session_get_url(source.css_class, 2021, session)
+                for source in LISTING_SOURCES
+                for session in (1, 2)
+            ),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import json
+import unittest
+from typing import NamedTuple
+
+import typedload
+
+from legisdata import schema
+from legisdata.codec import (
+    CODEC_FORMAT,
+    codec_dump,
+    codec_fingerprint,
+    codec_load,
+)
+
+META = schema.Meta(
+    source="HANSARD-1.pdf", year=2020, session=2, dun="selangor", parse_time="now"
+)
+SPEAKER = schema.Person(name="Tuan Speaker", raw="TUAN SPEAKER", title=["Tuan"])
+MEMBER = schema.Person(name="Ahmad", raw="AHMAD (Sungai Air Tawar)", area="Sungai")
+
+HANSARD = schema.Hansard(
+    meta=META,
+    present=[SPEAKER, MEMBER],
+    officer=[schema.Person(name="Setiausaha", raw="SETIAUSAHA", role="Setiausaha")],
+    debate=[
+        schema.Speech(
+            by=SPEAKER,
+            role=None,
+            content=[
+                schema.ContentElement(type="NarrativeText", value="Sila.", image=None),
+                schema.ContentElement(type="Image", value="", image="ab" * 32),
+            ],
+        ),
+        schema.Questions(
+            content=[
+                schema.Question(
+                    inquirer=MEMBER,
+                    role="Ahli",
+                    content=[
+                        schema.ContentElement(type="Title", value="1.", image=None)
+                    ],
+                    is_oral=True,
+                ),
+                schema.Answer(respondent=SPEAKER, role=None, content=[]),
+            ]
+        ),
+    ],
+    akn_file="HANSARD-1.pdf.akn.xml",
+)
+
+INQUIRY = schema.Inquiry(
+    meta=META,
+    is_oral=True,
+    inquirer=MEMBER,
+    number=12,
+    title="Banjir",
+    inquiries=[[schema.ContentElement(type="ListItem", value="a)", image=None)]],
+    responds=[[], [schema.ContentElement(type="Table", value="", image="cd" * 32)]],
+)
+
+
+# the same record as schema.Person, as it looked before a field was reordered
+class Person(NamedTuple):
+    name: str
+    title: list[str] = []
+    raw: str = ""
+    area: str | None = None
+    role: str | None = None
+
+
+# schema.Inquiry itself unchanged, only holding the stale Person
+class Inquiry(NamedTuple):
+    meta: schema.Meta
+    is_oral: bool = False
+    inquirer: Person | None = None
+    respondent: Person | None = None
+    number: int | None = None
+    title: str | None = None
+    inquiries: list[list[schema.ContentElement]] = []
+    responds: list[list[schema.ContentElement]] = []
+    akn: str | None = None
+    akn_file: str | None = None
+
+
+class CodecTestCase(unittest.TestCase):
+    def roundtrip(self, value: tuple) -> tuple:
+        return codec_load(json.loads(json.dumps(codec_dump(value))), type(value))
+
+    def test_roundtrip_hansard(self) -> None:
+        self.assertEqual(self.roundtrip(HANSARD), HANSARD)
+
+    def test_roundtrip_inquiry(self) -> None:
+        self.assertEqual(self.roundtrip(INQUIRY), INQUIRY)
+
+    def test_roundtrip_union(self) -> None:
+        # the type name tag picks the member, not the first one that fits
+        result = self.roundtrip(HANSARD)
+
+        self.assertIsInstance(result.debate[0], schema.Speech)
+        self.assertIsInstance(result.debate[1], schema.Questions)
+        self.assertIsInstance(result.debate[1].content[0], schema.Question)
+        self.assertIsInstance(result.debate[1].content[1], schema.Answer)
+
+    def test_roundtrip_defaults(self) -> None:
+        value = schema.Inquiry(meta=META)
+
+        self.assertEqual(self.roundtrip(value), value)
+
+    def test_envelope(self) -> None:
+        data = codec_dump(INQUIRY)
+
+        self.assertEqual(data["format"], CODEC_FORMAT)
+        self.assertEqual(data["schema"], codec_fingerprint(schema.Inquiry))
+        self.assertEqual(data["data"][0], "Inquiry")
+
+    def test_typedload_fallback(self) -> None:
+        for value in (HANSARD, INQUIRY):
+            data = json.loads(json.dumps(typedload.dump(value)))
+
+            self.assertEqual(codec_load(data, type(value)), value)
+
+    def test_unsupported_version(self) -> None:
+        data = codec_dump(INQUIRY)
+        data["version"] = 1
+
+        with self.assertRaises(ValueError):
+            codec_load(data, schema.Inquiry)
+
+    def test_stale_schema(self) -> None:
+        stale = codec_dump(
+            Person(name="Ahmad", title=["Dato'"], raw="DATO' AHMAD", area="Sungai")
+        )
+
+        # positionally this would put the title list into raw
+        self.assertNotEqual(stale["schema"], codec_fingerprint(schema.Person))
+        with self.assertRaises(ValueError):
+            codec_load(stale, schema.Person)
+
+    def test_stale_nested_schema(self) -> None:
+        stale = codec_dump(
+            Inquiry(meta=META, inquirer=Person(name="Ahmad", title=["Dato'"]))
+        )
+
+        # only Person changed, deep in the tree, and it still invalidates the file
+        self.assertNotEqual(stale["schema"], codec_fingerprint(schema.Inquiry))
+        with self.assertRaises(ValueError):
+            codec_load(stale, schema.Inquiry)
+
+
+if __name__ == "__main__":
+    unittest.main()
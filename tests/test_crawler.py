@@ -0,0 +1,298 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+from legisdata.common import LISTING_SOURCES, ListingClass, data_get_path, path_generate
+from legisdata.crawler import (
+    FetchConfig,
+    Fetcher,
+    ListingSession,
+    RateLimiter,
+    archive_download,
+)
+from legisdata.manifest import Manifest, ManifestEntry
+
+LISTING = ListingSession(source=LISTING_SOURCES[0], year=2020, session=2, url="")
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Serves fixed documents with ETags, Range support and scripted failures."""
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+
+        self.lock = threading.Lock()
+        self.documents: dict[str, bytes] = {}
+        self.failures: dict[str, list[int]] = {}
+        self.truncate: set[str] = set()
+        self.delay = 0.0
+        self.requests: list[tuple[float, str, dict[str, str], int]] = []
+        self.active = self.peak = 0
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    server: StandInServer
+
+    def log_message(self, *_) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        with self.server.lock:
+            self.server.active += 1
+            self.server.peak = max(self.server.peak, self.server.active)
+
+        try:
+            time.sleep(self.server.delay)
+            self.respond()
+
+        finally:
+            with self.server.lock:
+                self.server.active -= 1
+
+    def record(self, status: int) -> None:
+        with self.server.lock:
+            self.server.requests.append(
+                (time.monotonic(), self.path, dict(self.headers), status)
+            )
+
+    def respond(self) -> None:
+        failures = self.server.failures.get(self.path)
+        if failures:
+            status = failures.pop(0)
+            self.record(status)
+            self.send_response(status)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = self.server.documents[self.path]
+        etag = f'"{sha256(body).hexdigest()}"'
+
+        if self.headers.get("If-None-Match") == etag:
+            self.record(HTTPStatus.NOT_MODIFIED)
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        if self.headers.get("Range") and self.headers.get("If-Range") == etag:
+            start = int(self.headers["Range"].removeprefix("bytes=").rstrip("-"))
+
+            if start >= len(body):
+                self.record(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            self.record(HTTPStatus.PARTIAL_CONTENT)
+            self.send_response(HTTPStatus.PARTIAL_CONTENT)
+            self.send_header("ETag", etag)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}"
+            )
+            self.send_header("Content-Length", str(len(body) - start))
+            self.end_headers()
+            self.wfile.write(body[start:])
+            return
+
+        self.record(HTTPStatus.OK)
+        self.send_response(HTTPStatus.OK)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        # promise the whole body, send half and hang up
+        if self.path in self.server.truncate:
+            self.server.truncate.discard(self.path)
+            self.wfile.write(body[: len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+
+        self.wfile.write(body)
+
+
+class CrawlerTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cwd = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        os.chdir(self.directory.name)
+
+        self.server = StandInServer()
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+        self.raw_path = data_get_path(
+            path_generate(LISTING.year, LISTING.session),
+            LISTING.source.listing_type,
+            ListingClass.RAW,
+        )
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def download(self, paths: list[str], config: FetchConfig) -> None:
+        with Fetcher(config) as fetcher, ThreadPoolExecutor(config.workers) as executor:
+            archive_download(
+                fetcher,
+                executor,
+                ((LISTING, [self.server.url(path) for path in paths]),),
+            )
+
+    def assert_downloaded(self, path: str) -> None:
+        self.assertEqual(
+            (self.raw_path / path.lstrip("/")).read_bytes(),
+            self.server.documents[path],
+        )
+        self.assertFalse(Path(f"{self.raw_path / path.lstrip('/')}.part").exists())
+
+        entry = Manifest(self.raw_path / "manifest.json").get(self.server.url(path))
+        assert entry is not None
+        self.assertEqual(entry.sha256, sha256(self.server.documents[path]).hexdigest())
+
+    def test_concurrent_fetch(self) -> None:
+        paths = [f"/{idx}.pdf" for idx in range(8)]
+        for idx, path in enumerate(paths):
+            self.server.documents[path] = os.urandom(1000 + idx)
+        self.server.delay = 0.2
+
+        time_start = time.monotonic()
+        self.download(paths, FetchConfig(workers=4, rate=0, backoff=0))
+
+        self.assertGreater(self.server.peak, 1)
+        self.assertLess(time.monotonic() - time_start, len(paths) * 0.2)
+        for path in paths:
+            self.assert_downloaded(path)
+
+    def test_rate_limit(self) -> None:
+        paths = [f"/{idx}.pdf" for idx in range(5)]
+        for path in paths:
+            self.server.documents[path] = os.urandom(100)
+
+        self.download(paths, FetchConfig(workers=4, rate=10, backoff=0))
+
+        # timed on the server side, so allow for some scheduling jitter
+        times = sorted(request[0] for request in self.server.requests)
+        self.assertGreaterEqual(times[-1] - times[0], (len(paths) - 1) * 0.1 * 0.8)
+
+    def test_rate_limit_per_host(self) -> None:
+        limiter = RateLimiter(1)
+        limiter.wait("http://a.example/1.pdf")
+
+        # another host is not held back by the first one
+        time_start = time.monotonic()
+        limiter.wait("http://b.example/1.pdf")
+        self.assertLess(time.monotonic() - time_start, 0.5)
+
+    def test_retry_throttled(self) -> None:
+        self.server.documents["/a.pdf"] = os.urandom(100)
+        self.server.failures["/a.pdf"] = [
+            HTTPStatus.TOO_MANY_REQUESTS,
+            HTTPStatus.SERVICE_UNAVAILABLE,
+        ]
+
+        self.download(["/a.pdf"], FetchConfig(workers=1, rate=0, retries=3, backoff=0))
+
+        self.assertEqual(
+            [request[3] for request in self.server.requests],
+            [
+                HTTPStatus.TOO_MANY_REQUESTS,
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                HTTPStatus.OK,
+            ],
+        )
+        self.assert_downloaded("/a.pdf")
+
+    def test_retry_exhausted(self) -> None:
+        self.server.documents["/a.pdf"] = os.urandom(100)
+        self.server.failures["/a.pdf"] = [HTTPStatus.SERVICE_UNAVAILABLE] * 5
+
+        with self.assertRaises(requests.exceptions.RetryError):
+            self.download(
+                ["/a.pdf"], FetchConfig(workers=1, rate=0, retries=2, backoff=0)
+            )
+
+        self.assertFalse((self.raw_path / "a.pdf").exists())
+
+    def test_not_modified(self) -> None:
+        self.server.documents["/a.pdf"] = os.urandom(100)
+        config = FetchConfig(workers=1, rate=0, backoff=0)
+
+        self.download(["/a.pdf"], config)
+        mtime = (self.raw_path / "a.pdf").stat().st_mtime_ns
+        self.download(["/a.pdf"], config)
+
+        _, _, headers, status = self.server.requests[-1]
+        self.assertEqual(status, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(
+            headers["If-None-Match"],
+            f'"{sha256(self.server.documents["/a.pdf"]).hexdigest()}"',
+        )
+        self.assertEqual((self.raw_path / "a.pdf").stat().st_mtime_ns, mtime)
+        self.assert_downloaded("/a.pdf")
+
+    def test_resume_truncated(self) -> None:
+        body = os.urandom(1 << 18)
+        self.server.documents["/a.pdf"] = body
+        self.server.truncate.add("/a.pdf")
+
+        self.download(["/a.pdf"], FetchConfig(workers=1, rate=0, backoff=0))
+
+        (_, _, _, first), (_, _, headers, second) = self.server.requests
+        self.assertEqual(first, HTTPStatus.OK)
+        self.assertEqual(second, HTTPStatus.PARTIAL_CONTENT)
+        self.assertEqual(headers["Range"], f"bytes={len(body) // 2}-")
+        self.assertEqual(headers["If-Range"], f'"{sha256(body).hexdigest()}"')
+        self.assert_downloaded("/a.pdf")
+
+    def test_range_not_satisfiable(self) -> None:
+        body = os.urandom(100)
+        self.server.documents["/a.pdf"] = body
+
+        # a partial file longer than the remote copy, left by an earlier run
+        os.makedirs(self.raw_path)
+        Manifest(self.raw_path / "manifest.json").update(
+            ManifestEntry(
+                url=self.server.url("/a.pdf"),
+                path=str(self.raw_path / "a.pdf"),
+                year=LISTING.year,
+                session=LISTING.session,
+                dun="selangor",
+                etag=f'"{sha256(body).hexdigest()}"',
+            )
+        )
+        Path(f"{self.raw_path / 'a.pdf'}.part").write_bytes(os.urandom(200))
+
+        self.download(["/a.pdf"], FetchConfig(workers=1, rate=0, backoff=0))
+
+        self.assertEqual(
+            [request[3] for request in self.server.requests],
+            [HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, HTTPStatus.OK],
+        )
+        self.assertNotIn("Range", self.server.requests[-1][2])
+        self.assert_downloaded("/a.pdf")
+
+
+if __name__ == "__main__":
+    unittest.main()
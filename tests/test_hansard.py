@@ -0,0 +1,208 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from posixpath import basename
+from unittest import mock
+
+import typedload
+
+from legisdata.codec import codec_load
+from legisdata.parser.hansard import (
+    HANSARD_TRANSITIONS,
+    HansardBuilder,
+    HansardLine,
+    HansardSection,
+    HansardState,
+    HansardTransition,
+    line_normalize,
+    parse,
+    parse_file,
+    speaker_get_matcher,
+    speaker_match,
+)
+from legisdata.schema import Hansard, Meta, Person
+from legisdata.store import STORE_SUFFIX, ExtractElement, store_read
+
+# the expected files were written by the parser before it built hansards in
+# place, any change to them is a change in what the parser produces
+FIXTURE_PATH = Path(__file__).parent / "fixtures" / "hansard"
+FIXTURE_NAME = "HANSARD-2020-11-02.pdf"
+
+AHMAD = Person(name="Y.B. Dato' Ahmad", raw="Y.B. Dato' Ahmad")
+AHMAD_FUAD = Person(name="Y.B. Dato' Ahmad Fuad", raw="Y.B. Dato' Ahmad Fuad")
+
+
+def speaker_get(hansard: HansardBuilder, text: str) -> str | None:
+    return speaker_match(hansard, line_normalize(ExtractElement("NarrativeText", text)))
+
+
+class HansardGoldenTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.parse_path = Path(self.directory.name)
+
+        parse_file(
+            2020,
+            2,
+            str(FIXTURE_PATH / f"{FIXTURE_NAME}{STORE_SUFFIX}"),
+            self.parse_path,
+        )
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_json(self) -> None:
+        with open(self.parse_path / f"{FIXTURE_NAME}.json") as parse_file:
+            result = codec_load(json.load(parse_file), Hansard)
+
+        with open(FIXTURE_PATH / f"{FIXTURE_NAME}.json") as expected_file:
+            expected = typedload.load(json.load(expected_file), Hansard)
+
+        result = result._replace(
+            meta=result.meta._replace(source=basename(result.meta.source))
+        )
+        for field in Hansard._fields:
+            with self.subTest(field=field):
+                self.assertEqual(getattr(result, field), getattr(expected, field))
+
+    def test_akn(self) -> None:
+        self.assertEqual(
+            (self.parse_path / f"{FIXTURE_NAME}.akn.xml").read_text(encoding="utf-8"),
+            (FIXTURE_PATH / f"{FIXTURE_NAME}.akn.xml").read_text(encoding="utf-8"),
+        )
+
+
+class HansardTransitionTestCase(unittest.TestCase):
+    def test_transitions(self) -> None:
+        taken: set[tuple[HansardSection, int]] = set()
+
+        def transition_record(
+            section: HansardSection, idx: int, transition: HansardTransition
+        ) -> HansardTransition:
+            check, handle = transition
+
+            def handle_record(line: HansardLine, state: HansardState) -> None:
+                taken.add((section, idx))
+                handle(line, state)
+
+            return check, handle_record
+
+        with mock.patch.dict(
+            HANSARD_TRANSITIONS,
+            {
+                section: tuple(
+                    transition_record(section, idx, transition)
+                    for idx, transition in enumerate(transitions)
+                )
+                for section, transitions in HANSARD_TRANSITIONS.items()
+            },
+        ):
+            parse(
+                2020,
+                2,
+                store_read(FIXTURE_PATH / f"{FIXTURE_NAME}{STORE_SUFFIX}"),
+            )
+
+        # nothing moves the parser into these, and they only repeat checks
+        # that are already taken in the sitting itself
+        unreachable = (
+            HansardSection.SPEECH,
+            HansardSection.QUESTION,
+            HansardSection.ANSWER,
+        )
+        for section in unreachable:
+            for transition in HANSARD_TRANSITIONS[section]:
+                self.assertIn(transition, HANSARD_TRANSITIONS[HansardSection.START])
+
+        for section, transitions in HANSARD_TRANSITIONS.items():
+            if section in unreachable:
+                continue
+
+            for idx in range(len(transitions)):
+                with self.subTest(section=section.name, transition=idx):
+                    self.assertIn((section, idx), taken)
+
+
+class SpeakerMatcherTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.hansard = HansardBuilder(
+            Meta(source="", year=2020, session=2, dun="selangor")
+        )
+
+    def test_first_match(self) -> None:
+        # the roster order decides, as in the scan the pattern replaced, so a
+        # shorter name listed first wins over the longest prefix
+        self.hansard.present.extend((AHMAD, AHMAD_FUAD))
+
+        self.assertEqual(
+            speaker_get(self.hansard, "Y.B. DATO' AHMAD FUAD: Soalan tambahan."),
+            "Y.B. DATO' AHMAD",
+        )
+
+    def test_first_match_longer(self) -> None:
+        self.hansard.present.extend((AHMAD_FUAD, AHMAD))
+
+        self.assertEqual(
+            speaker_get(self.hansard, "Y.B. DATO' AHMAD FUAD: Soalan tambahan."),
+            "Y.B. DATO' AHMAD FUAD",
+        )
+        self.assertEqual(
+            speaker_get(self.hansard, "Y.B. DATO' AHMAD: Soalan tambahan."),
+            "Y.B. DATO' AHMAD",
+        )
+
+    def test_candidate_order(self) -> None:
+        self.hansard.officer.append(
+            Person(name="Encik Azmi", raw="Encik Azmi", role="Setiausaha Dewan Kanan")
+        )
+
+        # the fixed roles are tried before any officer role
+        self.assertEqual(
+            speaker_get(self.hansard, "SETIAUSAHA DEWAN KANAN: Usul."),
+            "SETIAUSAHA DEWAN",
+        )
+
+        self.hansard.guest.append(
+            Person(name="Y.B. Tuan Speaker", raw="Y.B. Tuan Speaker Jemputan")
+        )
+
+        # and guests before both
+        self.assertEqual(
+            speaker_get(self.hansard, "Y.B. TUAN SPEAKER JEMPUTAN: Terima kasih."),
+            "Y.B. TUAN SPEAKER JEMPUTAN",
+        )
+
+    def test_roster_growth(self) -> None:
+        self.hansard.present.append(AHMAD)
+        matcher = speaker_get_matcher(self.hansard)
+
+        self.assertIs(speaker_get_matcher(self.hansard), matcher)
+        self.assertIsNone(speaker_get(self.hansard, "BENTARA KANAN: Sila bangun."))
+
+        # an officer joining mid-debate is matched from the next line on
+        self.hansard.officer.append(
+            Person(name="Puan Zaleha", raw="Puan Zaleha", role="Bentara Kanan")
+        )
+
+        self.assertIsNot(speaker_get_matcher(self.hansard), matcher)
+        self.assertEqual(
+            speaker_get(self.hansard, "BENTARA KANAN: Sila bangun."), "BENTARA KANAN"
+        )
+
+    def test_literal(self) -> None:
+        self.hansard.present.append(Person(name="", raw=""))
+
+        # an empty name is no alternative, and the dots are not wildcards
+        self.assertIsNone(speaker_get(self.hansard, "Sila duduk."))
+        self.assertIsNone(
+            speaker_get(self.hansard, "Y-A-B- DATO' MENTERI BESAR : Saya mohon.")
+        )
+        self.assertEqual(
+            speaker_get(self.hansard, "y.a.b. dato' menteri besar: saya mohon."),
+            "Y.A.B. DATO' MENTERI BESAR",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from legisdata.journal import Journal, JournalEntry
+
+
+def entry_make(number: int, directory: str) -> JournalEntry:
+    target = Path(directory, f"HANSARD-{number}.pdf.elements.jsonl")
+    target.touch()
+
+    return JournalEntry(
+        source=f"HANSARD-{number}.pdf",
+        target=str(target),
+        key=f"key-{number}",
+        elements=number * 10,
+    )
+
+
+class JournalTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name, "extract.journal")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_resume(self) -> None:
+        first, second = (entry_make(number, self.directory.name) for number in (1, 2))
+
+        with Journal(self.path) as journal:
+            journal.record(first)
+
+        with Journal(self.path, resume=True) as journal:
+            self.assertTrue(journal.completed(first.source, first.key))
+            # a changed file or configuration is extracted again
+            self.assertFalse(journal.completed(first.source, "key-changed"))
+            self.assertFalse(journal.completed(second.source, second.key))
+
+            journal.record(second)
+
+        with Journal(self.path, resume=True) as journal:
+            self.assertEqual(set(journal.entries), {first.source, second.source})
+            self.assertEqual(journal.entries[second.source].elements, 20)
+            self.assertIsNotNone(journal.entries[second.source].finish_time)
+
+    def test_fresh(self) -> None:
+        entry = entry_make(1, self.directory.name)
+
+        with Journal(self.path) as journal:
+            journal.record(entry)
+
+        # without resume the previous run is forgotten
+        with Journal(self.path) as journal:
+            self.assertFalse(journal.completed(entry.source, entry.key))
+
+        self.assertEqual(self.path.read_text(), "")
+
+    def test_missing_target(self) -> None:
+        entry = entry_make(1, self.directory.name)
+
+        with Journal(self.path) as journal:
+            journal.record(entry)
+
+        Path(entry.target).unlink()
+
+        with Journal(self.path, resume=True) as journal:
+            self.assertFalse(journal.completed(entry.source, entry.key))
+
+    def test_truncated(self) -> None:
+        first, second, third = (
+            entry_make(number, self.directory.name) for number in (1, 2, 3)
+        )
+
+        with Journal(self.path) as journal:
+            journal.record(first)
+            journal.record(second)
+
+        # killed halfway through writing the second entry
+        content = self.path.read_text()
+        self.path.write_text(content[: len(content) - 20])
+
+        with Journal(self.path, resume=True) as journal:
+            self.assertTrue(journal.completed(first.source, first.key))
+            self.assertFalse(journal.completed(second.source, second.key))
+
+            journal.record(third)
+
+        # the entry after the cut starts on its own line and is read back
+        lines = self.path.read_text().splitlines()
+        self.assertEqual(json.loads(lines[-1])["source"], third.source)
+
+        with Journal(self.path, resume=True) as journal:
+            self.assertEqual(set(journal.entries), {first.source, third.source})
+
+    def test_garbage(self) -> None:
+        entry = entry_make(1, self.directory.name)
+        self.path.write_text('{"source": 1}\nnot json\n\n{"source": "x"')
+
+        with Journal(self.path, resume=True) as journal:
+            self.assertEqual(journal.entries, {})
+
+            journal.record(entry)
+
+        with Journal(self.path, resume=True) as journal:
+            self.assertTrue(journal.completed(entry.source, entry.key))
+
+
+if __name__ == "__main__":
+    unittest.main()
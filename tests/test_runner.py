@@ -0,0 +1,188 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from legisdata.common import ListingType
+from legisdata.parser import hansard, runner
+from legisdata.parser.runner import (
+    PARSE_FILE,
+    PARSE_MODULES,
+    ParseEntry,
+    ParseManifest,
+    ParseTask,
+    parse_fingerprints,
+    parse_run,
+)
+from legisdata.store import STORE_SUFFIX
+
+FIXTURE_PATH = Path(__file__).parent / "fixtures" / "hansard"
+FIXTURE_NAME = "HANSARD-2020-11-02.pdf"
+SOURCE_NAMES = ("HANSARD-2020-11-02.pdf", "HANSARD-2020-11-03.pdf")
+
+
+class ParseRunTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.archive_path = Path(self.directory.name, "hansard-archive")
+        self.parse_path = Path(self.directory.name, "hansard-parse")
+        self.manifest_path = Path(self.directory.name, "parse-manifest.json")
+        os.makedirs(self.archive_path)
+        os.makedirs(self.parse_path)
+
+        self.tasks = tuple(
+            ParseTask(
+                listing_type=ListingType.Hansard,
+                source=str(self.archive_path / f"{name}{STORE_SUFFIX}"),
+                target=self.parse_path,
+                progress=f"{idx + 1}/{len(SOURCE_NAMES)}",
+            )
+            for idx, name in enumerate(SOURCE_NAMES)
+        )
+        for task in self.tasks:
+            shutil.copyfile(FIXTURE_PATH / f"{FIXTURE_NAME}{STORE_SUFFIX}", task.source)
+
+        # every test starts from the fingerprint of the parser on disk
+        patcher = mock.patch.dict(parse_fingerprints, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def run_parse(self, force: tuple[str, ...] = ()) -> list[str]:
+        parse_file = mock.Mock(wraps=hansard.parse_file)
+
+        with mock.patch.dict(PARSE_FILE, {ListingType.Hansard: parse_file}):
+            parse_run(2020, 2, self.tasks, self.manifest_path, force=force)
+
+        return [Path(call.args[2]).name for call in parse_file.call_args_list]
+
+    def test_unchanged(self) -> None:
+        self.assertEqual(len(self.run_parse()), 2)
+
+        outputs = {
+            name: (self.parse_path / name).stat().st_mtime_ns
+            for name in os.listdir(self.parse_path)
+        }
+        self.assertEqual(len(outputs), 4)
+
+        self.assertEqual(self.run_parse(), [])
+        # nothing is written again either
+        self.assertEqual(
+            {
+                name: (self.parse_path / name).stat().st_mtime_ns
+                for name in os.listdir(self.parse_path)
+            },
+            outputs,
+        )
+
+    def test_changed_input(self) -> None:
+        self.run_parse()
+
+        with open(self.tasks[1].source, "a") as source_file:
+            source_file.write('["NarrativeText","Sekian.",null,5,null]\n')
+
+        self.assertEqual(self.run_parse(), [Path(self.tasks[1].source).name])
+
+    def test_missing_output(self) -> None:
+        self.run_parse()
+
+        os.remove(self.parse_path / f"{SOURCE_NAMES[0]}.akn.xml")
+
+        self.assertEqual(self.run_parse(), [Path(self.tasks[0].source).name])
+
+    def test_changed_fingerprint(self) -> None:
+        self.run_parse()
+
+        with mock.patch.dict(parse_fingerprints, {ListingType.Hansard: "0" * 64}):
+            self.assertEqual(len(self.run_parse()), 2)
+
+            self.assertEqual(self.run_parse(), [])
+
+        # and back on the fingerprint of the parser on disk
+        self.assertEqual(len(self.run_parse()), 2)
+
+    def test_changed_parser_source(self) -> None:
+        module_path = Path(self.directory.name, "hansard.py")
+        module_path.write_text("HANSARD_ROLES = ()\n")
+        module = SimpleNamespace(__file__=str(module_path))
+
+        with mock.patch.dict(PARSE_MODULES, {ListingType.Hansard: (module,)}):
+            self.run_parse()
+            self.assertEqual(self.run_parse(), [])
+
+            module_path.write_text('HANSARD_ROLES = ("TUAN SPEAKER",)\n')
+            # the fingerprint is kept for the process, a new run computes it again
+            parse_fingerprints.clear()
+
+            self.assertEqual(len(self.run_parse()), 2)
+
+    def test_force(self) -> None:
+        self.run_parse()
+
+        self.assertEqual(
+            self.run_parse(force=("*-11-03.pdf*",)), [Path(self.tasks[1].source).name]
+        )
+        self.assertEqual(self.run_parse(force=("inquiry",)), [])
+        self.assertEqual(len(self.run_parse(force=("hansard",))), 2)
+
+        # forcing is not remembered by the next run
+        self.assertEqual(self.run_parse(), [])
+
+    def test_manifest_unreadable(self) -> None:
+        self.run_parse()
+
+        self.manifest_path.write_text("{")
+
+        self.assertEqual(len(self.run_parse()), 2)
+        with open(self.manifest_path) as manifest_file:
+            self.assertEqual(len(json.load(manifest_file)["entries"]), 2)
+
+    def test_manifest_version(self) -> None:
+        self.run_parse()
+
+        with mock.patch.object(runner, "PARSE_MANIFEST_VERSION", 2):
+            self.assertEqual(len(self.run_parse()), 2)
+
+
+class ParseManifestTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name, "parse-manifest.json")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_record_dropped_outputs(self) -> None:
+        outputs = [
+            str(Path(self.directory.name, f"SOALAN-1.pdf.{n}.json")) for n in (1, 2)
+        ]
+        for output in outputs:
+            Path(output).touch()
+
+        with ParseManifest(self.path) as manifest:
+            manifest.record(ParseEntry(source="SOALAN-1.pdf", key="a", outputs=outputs))
+
+        # an inquiry the parser no longer finds goes with the new entry
+        with ParseManifest(self.path) as manifest:
+            self.assertTrue(manifest.completed("SOALAN-1.pdf", "a"))
+
+            manifest.record(
+                ParseEntry(source="SOALAN-1.pdf", key="b", outputs=outputs[:1])
+            )
+
+        self.assertTrue(os.path.isfile(outputs[0]))
+        self.assertFalse(os.path.isfile(outputs[1]))
+
+        with ParseManifest(self.path) as manifest:
+            self.assertFalse(manifest.completed("SOALAN-1.pdf", "a"))
+            self.assertTrue(manifest.completed("SOALAN-1.pdf", "b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
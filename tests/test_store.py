@@ -0,0 +1,147 @@
+import base64
+import json
+import os
+import pickle
+import tempfile
+import unittest
+from hashlib import sha256
+from pathlib import Path
+
+from legisdata.blob import BLOB_PATH, blob_read
+from legisdata.store import (
+    STORE_FORMAT,
+    STORE_LEGACY_SUFFIX,
+    STORE_SUFFIX,
+    STORE_VERSION,
+    ExtractElement,
+    store_list,
+    store_read,
+    store_write,
+)
+
+IMAGE = b"\x89PNG\r\n\x1a\n-not-really-a-png"
+ELEMENTS = [
+    ExtractElement(type="Title", text="PENYATA RASMI", page_number=1),
+    ExtractElement(
+        type="Table",
+        text="Ahmad – Sungai Air Tawar",
+        text_as_html="<table><tr><td>Ahmad</td></tr></table>",
+        page_number=2,
+    ),
+    ExtractElement(
+        type="Image", text="", page_number=2, image=sha256(IMAGE).hexdigest()
+    ),
+]
+
+
+class StoreTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        # the blob store is relative to the working directory
+        self.directory = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory.name)
+
+        self.path = Path(self.directory.name, f"HANSARD-1.pdf{STORE_SUFFIX}")
+
+    def tearDown(self) -> None:
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def test_roundtrip(self) -> None:
+        self.assertEqual(store_write(self.path, ELEMENTS), len(ELEMENTS))
+        self.assertEqual(list(store_read(self.path)), ELEMENTS)
+
+        with open(self.path) as store_file:
+            header = json.loads(store_file.readline())
+
+        self.assertEqual(header["format"], STORE_FORMAT)
+        self.assertEqual(header["version"], STORE_VERSION)
+
+    def test_write_atomic(self) -> None:
+        store_write(self.path, ELEMENTS)
+
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+        def elements_interrupted():
+            yield ELEMENTS[0]
+            raise RuntimeError("interrupted")
+
+        with self.assertRaises(RuntimeError):
+            store_write(self.path, elements_interrupted())
+
+        # the finished store is untouched by the one that never completed
+        self.assertEqual(list(store_read(self.path)), ELEMENTS)
+
+    def test_read_empty(self) -> None:
+        store_write(self.path, [])
+
+        self.assertEqual(list(store_read(self.path)), [])
+
+        # no header at all, as a file cut short before its first write
+        self.path.write_bytes(b"")
+
+        with self.assertRaises(ValueError):
+            list(store_read(self.path))
+
+    def test_read_unsupported(self) -> None:
+        self.path.write_text(
+            json.dumps({"format": STORE_FORMAT, "version": STORE_VERSION + 1}) + "\n"
+        )
+
+        with self.assertRaises(ValueError):
+            list(store_read(self.path))
+
+    def test_read_version_1(self) -> None:
+        with open(self.path, "w") as store_file:
+            store_file.write(
+                json.dumps(
+                    {
+                        "format": STORE_FORMAT,
+                        "version": 1,
+                        "fields": ExtractElement._fields,
+                    }
+                )
+                + "\n"
+            )
+            for element in ELEMENTS:
+                # version 1 carried the image payload itself
+                if element.image is not None:
+                    element = element._replace(
+                        image=base64.b64encode(IMAGE).decode("ascii")
+                    )
+
+                store_file.write(json.dumps(tuple(element)) + "\n")
+
+        self.assertEqual(list(store_read(self.path)), ELEMENTS)
+        self.assertEqual(blob_read(ELEMENTS[2].image), IMAGE)
+        self.assertTrue(Path(self.directory.name, BLOB_PATH).is_dir())
+
+    def test_read_legacy(self) -> None:
+        legacy_path = Path(self.directory.name, f"HANSARD-1.pdf{STORE_LEGACY_SUFFIX}")
+        with open(legacy_path, "wb") as legacy_file:
+            pickle.dump(ELEMENTS, legacy_file)
+
+        self.assertEqual(list(store_read(legacy_path)), ELEMENTS)
+
+    def test_list(self) -> None:
+        for name in ("HANSARD-1.pdf", "HANSARD-2.pdf"):
+            with open(
+                Path(self.directory.name, f"{name}{STORE_LEGACY_SUFFIX}"), "wb"
+            ) as legacy_file:
+                pickle.dump(ELEMENTS, legacy_file)
+
+        store_write(self.path, ELEMENTS)
+        Path(self.directory.name, "HANSARD-1.pdf").touch()
+
+        # the re-extracted store wins over its pickle, the other pickle stays
+        self.assertEqual(
+            store_list(self.directory.name),
+            [
+                str(self.path),
+                str(Path(self.directory.name, f"HANSARD-2.pdf{STORE_LEGACY_SUFFIX}")),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()